@@ -0,0 +1,199 @@
+"""Benchmarks for the generators, humanize and the splitter.
+
+Every (case, scale) pair runs in a fresh child process, so peak RSS is
+that case's own. Results go to a JSON file; pass a previous one as
+--baseline to fail (exit 1) when throughput drops or peak RSS grows by
+more than --threshold.
+
+    python scripts/benchmark.py --scales 1000 100000 1000000
+    python scripts/benchmark.py --baseline benchmarks/main.json --threshold 0.15
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+import serialization
+
+CASES = ["timeline", "chat", "posts", "humanize", "split"]
+SCALES = [1_000, 100_000, 1_000_000]
+OUTPUT_PATH = "benchmarks/results.json"
+THRESHOLD = 0.10
+
+
+# ---------------------------------
+# CASES (run inside the child)
+# ---------------------------------
+
+def _dir_bytes(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def case_timeline(n, tmp):
+    import generate_crisis_timeline as mod
+
+    out = os.path.join(tmp, "timeline.json")
+    start = perf_counter()
+    mod.save_timeline(mod.iter_timeline(n), out)
+    return perf_counter() - start, os.path.getsize(out)
+
+
+def case_chat(n, tmp):
+    import generate_crisis_chat as mod
+
+    out = os.path.join(tmp, "chat.json")
+    start = perf_counter()
+    mod.save_conversation(mod.generate_conversation(n), out)
+    return perf_counter() - start, os.path.getsize(out)
+
+
+def case_posts(n, tmp):
+    import generate_ru_synthetic_posts as mod
+
+    out = os.path.join(tmp, "posts.json")
+    start = perf_counter()
+    mod.save_posts(mod.generate_posts(n), out)
+    return perf_counter() - start, os.path.getsize(out)
+
+
+def case_humanize(n, tmp):
+    import generate_crisis_timeline as mod
+
+    phases = [mod.phase_for_index(i, n) for i in range(n)]
+    texts = [mod.GRAMMAR.render(phase) for phase in phases]
+    start = perf_counter()
+    for text, phase in zip(texts, phases):
+        mod.humanize(text, phase)
+    return perf_counter() - start, 0
+
+
+def case_split(n, tmp):
+    import generate_crisis_timeline as timeline
+    import split_crisis_timeline as mod
+
+    source = os.path.join(tmp, "timeline.json")
+    timeline.save_timeline(timeline.iter_timeline(n), source)  # not timed
+    out_dir = os.path.join(tmp, "pages")
+    start = perf_counter()
+    mod.main(source, out_dir)
+    return perf_counter() - start, _dir_bytes(out_dir)
+
+
+def run_case(name, n):
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        seconds, out_bytes = globals()[f"case_{name}"](n, tmp)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak_rss = rss if sys.platform == "darwin" else rss * 1024
+    return {
+        "case": name,
+        "records": n,
+        "wall_s": round(seconds, 4),
+        "records_per_s": round(n / seconds, 1) if seconds else None,
+        "peak_rss_bytes": peak_rss,
+        "output_bytes": out_bytes,
+    }
+
+
+# ---------------------------------
+# DRIVER
+# ---------------------------------
+
+def measure(name, n):
+    """Run one case in a child process and return its result dict."""
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", name, str(n)],
+        capture_output=True, check=True,
+    )
+    return serialization.loads(proc.stdout)
+
+
+def compare(results, baseline, threshold):
+    """Return human-readable regressions against a previous results file."""
+    problems = []
+    for key, new in results.items():
+        old = baseline.get(key)
+        if not old:
+            continue
+        if old["records_per_s"] and new["records_per_s"] < old["records_per_s"] * (1 - threshold):
+            problems.append(
+                f"{key}: throughput {new['records_per_s']:.0f}/s vs {old['records_per_s']:.0f}/s"
+            )
+        if new["peak_rss_bytes"] > old["peak_rss_bytes"] * (1 + threshold):
+            problems.append(
+                f"{key}: peak RSS {new['peak_rss_bytes'] >> 20} MiB vs {old['peak_rss_bytes'] >> 20} MiB"
+            )
+    return problems
+
+
+def print_table(results):
+    print(f"{'case':24}{'wall s':>10}{'rec/s':>14}{'RSS MiB':>10}{'out MiB':>10}")
+    for key, r in results.items():
+        print(
+            f"{key:24}{r['wall_s']:>10.3f}{r['records_per_s'] or 0:>14.0f}"
+            f"{r['peak_rss_bytes'] / 2**20:>10.1f}{r['output_bytes'] / 2**20:>10.2f}"
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the data scripts.")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--scales", nargs="+", type=int, default=SCALES)
+    parser.add_argument("--out", default=OUTPUT_PATH)
+    parser.add_argument("--baseline", default=None, help="previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed relative regression")
+    parser.add_argument("--child", nargs=2, metavar=("CASE", "N"), help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        name, n = args.child
+        sys.stdout.buffer.write(serialization.dumps(run_case(name, int(n))))
+        return 0
+
+    results = {}
+    for n in args.scales:
+        for name in args.cases:
+            results[f"{name}@{n}"] = measure(name, n)
+            print(f"  {name}@{n}: {results[f'{name}@{n}']['wall_s']:.3f}s", file=sys.stderr)
+
+    print_table(results)
+    doc = {
+        "python": platform.python_version(),
+        "json_backend": serialization.backend.name,
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "wb") as f:
+        serialization.dump(doc, f, pretty=True)
+    print(f"Saved {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, "rb") as f:
+            baseline = serialization.load(f)["results"]
+        problems = compare(results, baseline, args.threshold)
+        for line in problems:
+            print(f"REGRESSION {line}")
+        if problems:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""Incremental build of the generated datasets.
+
+    python -m scripts.build                 # build whatever is out of date
+    python -m scripts.build split --force   # rebuild split (and what it needs)
+
+The pipeline is a small DAG: the timeline feeds the splitter, chat and
+posts stand alone. Each step gets a fingerprint from its config (count,
+seed), the source of its script and of every local module that script
+imports, and the content hash of its inputs. A step is skipped when its
+fingerprint matches the last build and its output still hashes the same,
+so editing one generator's templates only rebuilds that generator's
+artifact and whatever reads it. Steps whose inputs are ready run
+concurrently, each in its own process (the generators use the global
+random module).
+
+Every step writes where its own script does by default (posts go to
+public/data/, which the app serves); --out-dir puts them all under one
+directory instead. Builds are always seeded (default 0) so that outputs
+are reproducible; --workers only changes speed, not output, and is not
+fingerprinted.
+"""
+
+import argparse
+import ast
+import contextlib
+import hashlib
+import importlib
+import io
+import os
+import sys
+from pathlib import Path
+from time import perf_counter
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+# the generator modules import their siblings by plain name
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import generate  # noqa: E402
+import serialization  # noqa: E402
+
+STATE_DIR = "data"
+STATE_NAME = ".build-state.json"
+SEED = 0
+
+# "output" names the module constant holding the step's default path
+STEPS = {
+    "timeline": {"module": "generate_crisis_timeline", "output": "OUTPUT_PATH", "deps": []},
+    "chat": {"module": "generate_crisis_chat", "output": "OUTPUT_PATH", "deps": []},
+    "posts": {"module": "generate_ru_synthetic_posts", "output": "OUTPUT_PATH", "deps": []},
+    "split": {"module": "split_crisis_timeline", "output": "OUTPUT_DIR", "deps": ["timeline"]},
+}
+
+
+# ---------------------------------
+# HASHING
+# ---------------------------------
+
+def local_imports(module: str) -> set:
+    """module plus every scripts/ module it imports, transitively."""
+    seen = set()
+    stack = [module]
+    while stack:
+        name = stack.pop()
+        path = SCRIPTS_DIR / f"{name}.py"
+        if name in seen or not path.exists():
+            continue
+        seen.add(name)
+        for node in ast.walk(ast.parse(path.read_bytes())):
+            if isinstance(node, ast.Import):
+                stack.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                stack.append(node.module)
+    return seen
+
+
+def file_sha256(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def output_sha256(path: Path, cached=None) -> str:
+    """Content hash of a file or directory; None if it does not exist.
+
+    A file whose size and mtime match the cached entry is not re-read.
+    """
+    if path.is_dir():
+        h = hashlib.sha256()
+        for p in sorted(path.rglob("*")):
+            if p.is_file():
+                h.update(f"{p.relative_to(path).as_posix()}:{file_sha256(p)}\n".encode("utf-8"))
+        return h.hexdigest()
+    if not path.is_file():
+        return None
+    st = path.stat()
+    if cached and cached.get("size") == st.st_size and cached.get("mtime_ns") == st.st_mtime_ns:
+        return cached["sha256"]
+    return file_sha256(path)
+
+
+def fingerprint(name: str, config: dict, input_hashes: dict) -> str:
+    h = hashlib.sha256()
+    h.update(serialization.dumps({"step": name, "config": config, "inputs": input_hashes}))
+    # generate.py picks each step's engine and options, so it counts too
+    for module in sorted(local_imports(STEPS[name]["module"]) | {"generate"}):
+        h.update(f"{module}:{file_sha256(SCRIPTS_DIR / f'{module}.py')}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def output_path(name: str, out_dir=None) -> Path:
+    """Where a step writes: its script's own default, or under out_dir."""
+    if out_dir:
+        return Path(out_dir) / generate.DEFAULT_NAMES[name]
+    step = STEPS[name]
+    return Path(getattr(importlib.import_module(step["module"]), step["output"]))
+
+
+def output_record(path: Path) -> dict:
+    record = {"sha256": output_sha256(path)}
+    if path.is_file():
+        st = path.stat()
+        record.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+    return record
+
+
+# ---------------------------------
+# STEPS
+# ---------------------------------
+
+def run_step(name: str, config: dict, out_dir: str, workers: int):
+    """Build one step (in a worker process); returns (seconds, log)."""
+    args = argparse.Namespace(
+        count=config.get("count"), seed=config["seed"], workers=workers, format=None,
+        engine=None, replies="uniform", thread_index=False,
+        append=False, profile=None, profile_alloc=False,
+    )
+    state = {"timeline": str(output_path("timeline", out_dir))}
+    log = io.StringIO()
+    start = perf_counter()
+    with contextlib.redirect_stdout(log):
+        generate.RUNNERS[name](args, str(output_path(name, out_dir)), state)
+    return perf_counter() - start, log.getvalue()
+
+
+def requested_steps(targets) -> list:
+    """targets plus their dependencies, in dependency order."""
+    order = []
+
+    def visit(name):
+        for dep in STEPS[name]["deps"]:
+            visit(dep)
+        if name not in order:
+            order.append(name)
+
+    for name in targets:
+        visit(name)
+    return order
+
+
+def load_state(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    with open(path, "rb") as f:
+        return serialization.load(f)
+
+
+def save_state(state: dict, path: Path):
+    with open(path, "wb") as f:
+        serialization.dump(state, f, pretty=True)
+
+
+def build(targets=None, out_dir=None, seed=SEED, count=None, jobs=None, workers=1,
+          force=False, dry_run=False) -> dict:
+    """Bring targets (default: all steps) up to date; returns step -> status."""
+    steps = requested_steps(targets or list(STEPS))
+    state_dir = out_dir or STATE_DIR
+    os.makedirs(state_dir, exist_ok=True)
+    state_path = Path(state_dir) / STATE_NAME
+    state = load_state(state_path)
+    config = {"seed": seed, "count": count}
+    status = {}
+    done = {}       # step -> output hash, for steps finished or up to date
+    pending = list(steps)
+    running = {}    # future -> (step, fingerprint)
+
+    def ready(name):
+        return all(dep in done for dep in STEPS[name]["deps"])
+
+    def check(name):
+        """Fingerprint name; mark it done if its output is current."""
+        inputs = {dep: done[dep] for dep in STEPS[name]["deps"]}
+        fp = fingerprint(name, config, inputs)
+        prev = state.get(name, {})
+        current = output_sha256(output_path(name, out_dir), prev.get("output"))
+        if not force and prev.get("fingerprint") == fp and current and current == prev["output"]["sha256"]:
+            done[name] = current
+            status[name] = "up to date"
+            print(f"[{name}] up to date")
+            return None
+        return fp
+
+    # imported here: concurrent.futures is a noticeable share of startup
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    with ProcessPoolExecutor(max_workers=jobs or len(steps)) as pool:
+        while pending or running:
+            for name in [n for n in pending if ready(n)]:
+                pending.remove(name)
+                fp = check(name)
+                if fp is None:
+                    continue
+                if dry_run:
+                    # pretend it ran so dependants are reported too
+                    done[name] = f"dirty:{fp}"
+                    status[name] = "would build"
+                    print(f"[{name}] would build")
+                    continue
+                future = pool.submit(run_step, name, config, out_dir, workers)
+                running[future] = (name, fp)
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, fp = running.pop(future)
+                seconds, log = future.result()
+                out = output_path(name, out_dir)
+                record = output_record(out)
+                state[name] = {"fingerprint": fp, "output": record}
+                save_state(state, state_path)
+                done[name] = record["sha256"]
+                status[name] = "built"
+                last = log.strip().splitlines()[-1:] or [""]
+                print(f"[{name}] built in {seconds:.2f}s: {last[0]}")
+    return status
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="*", metavar="STEP", help=f"any of {', '.join(STEPS)} (default: all)")
+    parser.add_argument("--out-dir", default=None, help="write every step under this directory")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--count", type=int, default=None, help="records per generated dataset")
+    parser.add_argument("--jobs", type=int, default=None, help="steps to run at once (default: all ready)")
+    parser.add_argument("--workers", type=int, default=1, help="processes inside each generator step")
+    parser.add_argument("--force", action="store_true", help="rebuild even if up to date")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be built")
+    args = parser.parse_args(argv)
+    for name in args.targets:
+        if name not in STEPS:
+            parser.error(f"unknown step {name!r}; choose from {', '.join(STEPS)}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    build(args.targets, args.out_dir, args.seed, args.count, args.jobs, args.workers, args.force, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import heapq
+import os
+from datetime import datetime
+from itertools import islice
+
+import serialization
+from generate_ru_synthetic_posts import CHANNELS, START_DATE, iter_channel_posts
+from serialization import iter_records
+from sharding import resolve_seed, shard_rng
+
+# ---------------------------------
+# CONFIG
+# ---------------------------------
+
+NUM_POSTS = 1000
+OUTPUT_PATH = "data/mirror_timeline.json"
+
+
+# ---------------------------------
+# STREAMS
+# ---------------------------------
+
+def timestamp_key(post) -> datetime:
+    ts = post["timestamp"]
+    return datetime.fromisoformat(ts) if isinstance(ts, str) else ts
+
+
+def checked(stream, name):
+    """Pass a stream through, failing loudly if it is not time-ordered."""
+    prev = None
+    for post in stream:
+        key = timestamp_key(post)
+        if prev is not None and key < prev:
+            raise ValueError(f"{name} is not sorted by timestamp at {post['timestamp']}")
+        prev = key
+        yield post
+
+
+def iter_feed_file(path):
+    """Posts of a time-ordered JSON array / NDJSON file, read incrementally."""
+    with open(path, "r", encoding="utf-8") as f:
+        yield from checked(iter_records(f), path)
+
+
+def feeds_start(paths):
+    """Earliest timestamp across the feed files (their first posts), or None."""
+    starts = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            first = next(iter_records(f), None)
+        if first is not None:
+            starts.append(timestamp_key(first))
+    return min(starts, default=None)
+
+
+def generated_streams(seed, start=START_DATE):
+    """One generated stream per RU channel, each with its own RNG."""
+    return [
+        iter_channel_posts(channel, shard_rng(seed, k, channel), start)
+        for k, channel in enumerate(CHANNELS)
+    ]
+
+
+# ---------------------------------
+# MERGE
+# ---------------------------------
+
+def merge_feeds(streams):
+    """Lazily k-way merge time-ordered streams into one mirror timeline.
+
+    heapq.merge keeps one pending post per stream, so memory is
+    O(len(streams)) however long the streams are. Ties keep stream order.
+    Ids are assigned in merged order.
+    """
+    for i, post in enumerate(heapq.merge(*streams, key=timestamp_key), start=1):
+        yield {"id": i, **{k: v for k, v in post.items() if k != "id"}}
+
+
+def save_mirror(posts, path=OUTPUT_PATH, fmt="json"):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        if fmt == "ndjson":
+            count = serialization.write_ndjson(posts, f)
+        else:
+            count = serialization.write_json_array(posts, f)
+    print(f"Saved {count} mirror posts to {path}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Merge channel/side feeds into one mirror timeline.")
+    parser.add_argument(
+        "--count", type=int, default=None,
+        help=f"posts to take from the merged stream (default {NUM_POSTS}; all of the feeds with --no-generated)",
+    )
+    parser.add_argument(
+        "--feed", action="append", default=[],
+        help="extra time-ordered JSON/NDJSON feed (e.g. another side); repeatable",
+    )
+    parser.add_argument("--no-generated", action="store_true", help="merge only the --feed files")
+    parser.add_argument(
+        "--start", type=datetime.fromisoformat, default=None,
+        help="when generated channels start (default: the earliest --feed post, else 2022-01-01)",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", default=OUTPUT_PATH)
+    parser.add_argument("--format", choices=["json", "ndjson"], default="json")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    start = args.start or feeds_start(args.feed) or START_DATE
+    streams = [] if args.no_generated else generated_streams(resolve_seed(args.seed), start)
+    streams += [iter_feed_file(path) for path in args.feed]
+    # generated channels never end, so they need a cap
+    count = args.count if args.count is not None or args.no_generated else NUM_POSTS
+    save_mirror(islice(merge_feeds(streams), count), args.out, args.format)
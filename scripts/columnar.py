@@ -0,0 +1,202 @@
+"""Dictionary-encoded columnar format for the generated datasets.
+
+A list of flat records is stored as one column per field:
+
+    range      consecutive integers (ids), stored as the first value
+    time       ISO timestamps, stored as a base plus second deltas
+    dict       strings, stored as a string table plus integer codes
+    dict_list  lists of strings (tags), same table plus lists of codes
+    plain      anything else, stored as-is
+
+The document is minified JSON, so the browser can still read it with a
+plain fetch + JSON.parse. Run this module on a dataset to compare it
+against the original JSON:
+
+    python scripts/columnar.py data/crisis_timeline.json
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from time import perf_counter
+
+import serialization
+
+FORMAT = "columnar-v1"
+
+
+# ---------------------------------
+# ENCODING
+# ---------------------------------
+
+def _is_range(values):
+    if not values or not all(type(v) is int for v in values):
+        return False
+    return all(b - a == 1 for a, b in zip(values, values[1:]))
+
+
+def _parse_time(value):
+    if isinstance(value, datetime):
+        return value if value.tzinfo is None else None
+    if not isinstance(value, str):
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    # only encode strings that decode back byte for byte
+    return dt if dt.isoformat() == value and dt.tzinfo is None else None
+
+
+def _parse_times(values):
+    """Whole-second timestamps of a column, or None at the first value that is not one."""
+    stamps = []
+    for v in values:
+        dt = _parse_time(v)
+        if dt is None or dt.microsecond:
+            return None
+        stamps.append(dt)
+    return stamps
+
+
+def _string_table(values):
+    table = {}
+    for v in values:
+        table.setdefault(v, len(table))
+    return table
+
+
+def encode_column(values):
+    if _is_range(values):
+        return {"type": "range", "start": values[0]}
+
+    stamps = _parse_times(values)
+    if stamps:
+        deltas = [int((b - a).total_seconds()) for a, b in zip(stamps, stamps[1:])]
+        return {"type": "time", "base": stamps[0].isoformat(), "deltas": [0] + deltas}
+
+    if values and all(isinstance(v, str) for v in values):
+        table = _string_table(values)
+        return {"type": "dict", "values": list(table), "codes": [table[v] for v in values]}
+
+    if values and all(isinstance(v, list) and all(isinstance(x, str) for x in v) for v in values):
+        table = _string_table(x for v in values for x in v)
+        return {
+            "type": "dict_list",
+            "values": list(table),
+            "codes": [[table[x] for x in v] for v in values],
+        }
+
+    return {"type": "plain", "values": values}
+
+
+def encode(records) -> dict:
+    records = list(records)
+    fields = list(records[0].keys()) if records else []
+    return {
+        "format": FORMAT,
+        "count": len(records),
+        "fields": fields,
+        "columns": {k: encode_column([r.get(k) for r in records]) for k in fields},
+    }
+
+
+def write(records, f) -> int:
+    """Encode records and write them, minified, to a binary file."""
+    doc = encode(records)
+    serialization.dump(doc, f)
+    return doc["count"]
+
+
+# ---------------------------------
+# DECODING
+# ---------------------------------
+
+def decode_column(col, count):
+    kind = col["type"]
+    if kind == "range":
+        return list(range(col["start"], col["start"] + count))
+    if kind == "time":
+        out = []
+        dt = datetime.fromisoformat(col["base"])
+        for delta in col["deltas"]:
+            dt += timedelta(seconds=delta)
+            out.append(dt.isoformat())
+        return out
+    if kind == "dict":
+        table = col["values"]
+        return [table[c] for c in col["codes"]]
+    if kind == "dict_list":
+        table = col["values"]
+        return [[table[c] for c in codes] for codes in col["codes"]]
+    if kind == "plain":
+        return col["values"]
+    raise ValueError(f"unknown column type: {kind}")
+
+
+def decode_columns(doc) -> dict:
+    """Field name -> list of decoded values, without building row dicts."""
+    if doc.get("format") != FORMAT:
+        raise ValueError(f"not a {FORMAT} document")
+    count = doc["count"]
+    return {k: decode_column(doc["columns"][k], count) for k in doc["fields"]}
+
+
+def decode(doc) -> list:
+    columns = decode_columns(doc)
+    fields = list(columns)
+    return [dict(zip(fields, row)) for row in zip(*columns.values())]
+
+
+def load(path) -> list:
+    with open(path, "rb") as f:
+        return decode(serialization.load(f))
+
+
+# ---------------------------------
+# SIZE / PARSE-TIME REPORT
+# ---------------------------------
+
+def _best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        fn()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def compare(json_path, out_path=None):
+    """Encode json_path next to itself and print size and parse time of both."""
+    out_path = out_path or os.path.splitext(json_path)[0] + ".columnar.json"
+    with open(json_path, "rb") as f:
+        raw_json = f.read()
+    records = serialization.loads(raw_json)
+    with open(out_path, "wb") as f:
+        write(records, f)
+    with open(out_path, "rb") as f:
+        raw_col = f.read()
+    if decode(serialization.loads(raw_col)) != records:
+        raise SystemExit(f"{out_path} does not round-trip")
+
+    size_json = os.path.getsize(json_path)
+    size_col = os.path.getsize(out_path)
+    t_json = _best_of(lambda: serialization.loads(raw_json))
+    t_parse = _best_of(lambda: serialization.loads(raw_col))
+    t_decode = _best_of(lambda: decode(serialization.loads(raw_col)))
+
+    print(f"{json_path} ({serialization.backend.name})")
+    print(f"  {'':22}{'bytes':>10}{'ms':>10}")
+    print(f"  {'json parse':22}{size_json:>10}{t_json * 1000:>10.2f}")
+    print(f"  {'columnar parse':22}{size_col:>10}{t_parse * 1000:>10.2f}")
+    print(f"  {'columnar to records':22}{'':>10}{t_decode * 1000:>10.2f}")
+    print(
+        f"  size {1 - size_col / size_json:.0%} smaller, "
+        f"parse {1 - t_parse / t_json:.0%} faster "
+        f"({t_decode / t_json:.1f}x json when rebuilt into records)"
+    )
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        compare(path)
@@ -0,0 +1,199 @@
+"""Single entry point for the data generators.
+
+    python -m scripts.generate timeline chat posts split --seed 7
+    python -m scripts.generate timeline --count 100000 --workers 8 --format ndjson
+
+Datasets run in the order given, in one process. Each generator module is
+imported only when its dataset is requested, and NumPy only by the code
+paths that use it, so a small run starts quickly. When "split" follows
+"timeline" in the same invocation it pages the timeline just written. --append
+extends existing timeline / chat files instead of regenerating them.
+"""
+
+import argparse
+import importlib
+import os
+import random
+import sys
+from time import perf_counter
+
+# the generator modules import their siblings by plain name
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+DATASETS = ["timeline", "chat", "posts", "split"]
+
+FORMATS = {
+    "timeline": ["json", "ndjson", "columnar"],
+    "chat": ["json", "columnar"],
+    "posts": ["json", "columnar"],
+    "split": [],
+}
+
+# --engine values per dataset; the first is each script's own default
+ENGINES = {
+    "timeline": ["python", "numpy"],
+    "chat": ["python"],
+    "posts": ["python", "batched"],
+    "split": [],
+}
+
+# file names used with --out-dir
+DEFAULT_NAMES = {
+    "timeline": "crisis_timeline.json",
+    "chat": "crisis_chat.json",
+    "posts": "ru_synthetic_posts.json",
+    "split": "crisis_pages",
+}
+
+
+def _sharded(args):
+    return args.workers is not None or args.seed is not None
+
+
+def _load(name, args):
+    mod = importlib.import_module(name)
+    if args.profile:
+        mod.instrument()
+    return mod
+
+
+def run_timeline(args, out, state):
+    mod = _load("generate_crisis_timeline", args)
+    count = args.count if args.count is not None else mod.NUM_MESSAGES
+    out = out or mod.OUTPUT_PATH
+    if args.append:
+        mod.append_timeline(count, out, args.seed)
+        state["timeline"] = out
+        return
+    if args.replies == "local":
+        if args.seed is not None:
+            random.seed(args.seed)
+        messages = mod.iter_timeline(count, mod.LocalReplies())
+    elif args.engine == "numpy":
+        messages = mod.iter_timeline_batched(count, seed=args.seed)
+    elif _sharded(args):
+        messages = mod.iter_timeline_sharded(count, args.seed, args.workers or 1)
+    else:
+        messages = mod.iter_timeline(count)
+    if args.profile:
+        messages = importlib.import_module("profiling").timed_iter("timeline.generate", messages, field="phase")
+    threads = mod.ThreadIndexBuilder() if args.thread_index else None
+    if threads:
+        messages = threads.feed(messages)
+    fmt = args.format or "json"
+    mod.save_timeline(messages, out, fmt)
+    if threads:
+        mod.save_index(threads.build(), mod.index_path(out))
+    if fmt != "columnar":  # the splitter reads JSON / NDJSON; parse_args rejects split after columnar
+        state["timeline"] = out
+
+
+def run_chat(args, out, state):
+    mod = _load("generate_crisis_chat", args)
+    count = args.count if args.count is not None else mod.NUM_MESSAGES
+    if args.append:
+        mod.append_conversation(count, out or mod.OUTPUT_PATH, args.seed)
+        return
+    if _sharded(args):
+        messages = mod.iter_conversation_sharded(count, args.seed, args.workers or 1)
+    else:
+        messages = mod.generate_conversation(count)
+    mod.save_conversation(messages, out or mod.OUTPUT_PATH, args.format or "json")
+
+
+def run_posts(args, out, state):
+    mod = _load("generate_ru_synthetic_posts", args)
+    count = args.count if args.count is not None else 500
+    batched = args.engine == "batched"
+    if _sharded(args):
+        posts = mod.iter_posts_sharded(count, args.seed, args.workers or 1, batched)
+    elif batched:
+        posts = mod.iter_posts_batched(count)
+    else:
+        posts = mod.iter_posts(count)
+    mod.save_posts(posts, out or mod.OUTPUT_PATH, args.format or "json")
+
+
+def run_split(args, out, state):
+    mod = _load("split_crisis_timeline", args)
+    source = state.get("timeline", mod.INPUT)
+    mod.main(source, out or mod.OUTPUT_DIR, workers=args.workers or 1)
+
+
+RUNNERS = {
+    "timeline": run_timeline,
+    "chat": run_chat,
+    "posts": run_posts,
+    "split": run_split,
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("datasets", nargs="+", choices=DATASETS)
+    parser.add_argument("--count", type=int, default=None, help="records per generated dataset")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--format", default=None, help="json, ndjson (timeline only) or columnar")
+    parser.add_argument(
+        "--engine", default=None,
+        help="numpy (timeline) or batched (posts); default: each script's own, python",
+    )
+    parser.add_argument(
+        "--replies", choices=["uniform", "local"], default="uniform",
+        help="timeline replies; local favours recent messages and active threads",
+    )
+    parser.add_argument("--thread-index", action="store_true", help="also write the timeline's <out>.threads.json")
+    parser.add_argument("--out", default=None, help="output path; only with a single dataset")
+    parser.add_argument("--out-dir", default=None, help="write every dataset under this directory")
+    parser.add_argument("--append", action="store_true", help="extend existing timeline / chat files in place")
+    parser.add_argument("--profile", metavar="REPORT", default=None, help="write a profiling report (JSON)")
+    parser.add_argument(
+        "--profile-alloc", action="store_true",
+        help="with --profile, also track allocations (tracemalloc)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.out and len(args.datasets) > 1:
+        parser.error("--out takes a single dataset; use --out-dir for several")
+    if args.append and ("posts" in args.datasets or args.format or args.workers is not None):
+        parser.error("--append extends timeline / chat JSON files with the serial generator only")
+    if args.format:
+        for dataset in args.datasets:
+            if dataset != "split" and args.format not in FORMATS[dataset]:
+                parser.error(f"{dataset} does not support --format {args.format}")
+    if args.engine:
+        for dataset in args.datasets:
+            if dataset != "split" and args.engine not in ENGINES[dataset]:
+                parser.error(f"{dataset} does not support --engine {args.engine}")
+    if (args.replies == "local" or args.thread_index) and "timeline" not in args.datasets:
+        parser.error("--replies / --thread-index only apply to the timeline")
+    if args.append and (args.engine or args.replies == "local" or args.thread_index):
+        parser.error("--append extends timeline / chat JSON files with the serial generator only")
+    if args.replies == "local" and (args.engine == "numpy" or (args.workers or 1) > 1):
+        # thread state runs through the whole timeline, so it stays serial
+        parser.error("--replies local needs the serial python engine")
+    if args.format == "columnar" and {"timeline", "split"} <= set(args.datasets):
+        parser.error("split reads a JSON / NDJSON timeline; generate it without --format columnar")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profile:
+        profiling = importlib.import_module("profiling")
+        profiling.enable(args.profile_alloc)
+    state = {}
+    for dataset in args.datasets:
+        out = args.out
+        if args.out_dir:
+            out = os.path.join(args.out_dir, DEFAULT_NAMES[dataset])
+        start = perf_counter()
+        RUNNERS[dataset](args, out, state)
+        print(f"[{dataset}] done in {perf_counter() - start:.2f}s")
+    if args.profile:
+        profiling.finish(args.profile)
+
+
+if __name__ == "__main__":
+    main()
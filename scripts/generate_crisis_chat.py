@@ -1,9 +1,25 @@
-import json
+import argparse
 import random
+import sys
+from bisect import bisect_right
 from datetime import datetime, timedelta
 import os
 
-print("Script starting...")
+import columnar
+import profiling
+import serialization
+from sampling import AliasTable
+from sharding import (
+    counter_randint,
+    prefix_offsets,
+    resolve_seed,
+    iter_sharded,
+    run_sharded,
+    shard_ranges,
+    shard_rng,
+    shard_seed,
+)
+from templates import Grammar
 
 # ---------------------------------
 # CONFIG
@@ -82,10 +98,13 @@ PHASES = [
 ]
 
 
+PHASE_STARTS = [h_start for _, h_start, _ in PHASES]
+
+
 def get_phase(hours_since_start: float) -> str:
-    for name, h_start, h_end in PHASES:
-        if h_start <= hours_since_start < h_end:
-            return name
+    i = bisect_right(PHASE_STARTS, hours_since_start) - 1
+    if 0 <= i < len(PHASES) and hours_since_start < PHASES[i][2]:
+        return PHASES[i][0]
     return PHASES[-1][0]
 
 
@@ -93,160 +112,175 @@ def get_phase(hours_since_start: float) -> str:
 # CATEGORY CODES
 # ---------------------------------
 
-def choose_categories(phase: str):
-    r = random.random()
-
-    if phase == "shock":
-        if r < 0.4:
-            return ["SI"]
-        elif r < 0.8:
-            return ["SA"]
-        elif r < 0.9:
-            return ["SI", "SA"]
-        else:
-            return ["CC"]
-
-    if phase == "negotiation":
-        if r < 0.3:
-            return ["SI"]
-        elif r < 0.55:
-            return ["SA"]
-        elif r < 0.8:
-            return ["CC"]
-        elif r < 0.9:
-            return ["SI", "CC"]
-        else:
-            return ["SA", "CC"]
-
-    if phase == "emotional":
-        if r < 0.2:
-            return ["EM"]
-        elif r < 0.4:
-            return ["C"]
-        elif r < 0.6:
-            return ["MN"]
-        elif r < 0.8:
-            return ["C", "EM"]
-        else:
-            return ["C", "EM", "MN"]
-
-    if phase == "polyvocal":
-        if r < 0.15:
-            return ["SI"]
-        elif r < 0.3:
-            return ["SA"]
-        elif r < 0.45:
-            return ["CC"]
-        elif r < 0.6:
-            return ["EM"]
-        elif r < 0.75:
-            return ["C", "EM"]
-        elif r < 0.9:
-            return ["C", "EM", "MN"]
-        else:
-            return ["SI", "SA", "EM"]
-
-    if phase == "routine":
-        if r < 0.2:
-            return ["SI"]
-        elif r < 0.35:
-            return ["SA"]
-        elif r < 0.5:
-            return ["EM"]
-        elif r < 0.7:
-            return ["MN"]
-        elif r < 0.9:
-            return ["EM", "MN"]
-        else:
-            return ["C", "MN"]
-
-    return ["SI"]
-
-
-# ---------------------------------
-# TEXT GENERATORS PER CATEGORY
-# ---------------------------------
+# Per-phase mix of category sets; weights are relative, edit freely.
+CATEGORY_MIX = {
+    "shock": [
+        (("SI",), 0.40),
+        (("SA",), 0.40),
+        (("SI", "SA"), 0.10),
+        (("CC",), 0.10),
+    ],
+    "negotiation": [
+        (("SI",), 0.30),
+        (("SA",), 0.25),
+        (("CC",), 0.25),
+        (("SI", "CC"), 0.10),
+        (("SA", "CC"), 0.10),
+    ],
+    "emotional": [
+        (("EM",), 0.20),
+        (("C",), 0.20),
+        (("MN",), 0.20),
+        (("C", "EM"), 0.20),
+        (("C", "EM", "MN"), 0.20),
+    ],
+    "polyvocal": [
+        (("SI",), 0.15),
+        (("SA",), 0.15),
+        (("CC",), 0.15),
+        (("EM",), 0.15),
+        (("C", "EM"), 0.15),
+        (("C", "EM", "MN"), 0.15),
+        (("SI", "SA", "EM"), 0.10),
+    ],
+    "routine": [
+        (("SI",), 0.20),
+        (("SA",), 0.15),
+        (("EM",), 0.15),
+        (("MN",), 0.20),
+        (("EM", "MN"), 0.20),
+        (("C", "MN"), 0.10),
+    ],
+}
+
+DEFAULT_CATEGORIES = ("SI",)
+
+CATEGORY_SAMPLERS = {
+    phase: AliasTable([cats for cats, _ in mix], [w for _, w in mix])
+    for phase, mix in CATEGORY_MIX.items()
+}
 
-def random_neighborhood():
-    return random.choice(NEIGHBORHOODS)
 
-def random_street():
-    return random.choice(STREETS)
+def choose_categories(phase: str):
+    sampler = CATEGORY_SAMPLERS.get(phase)
+    if sampler is None:
+        return list(DEFAULT_CATEGORIES)
+    return list(sampler.draw())
 
-def random_metro():
-    return random.choice(METRO_STOPS)
 
-def random_landmark():
-    return random.choice(LANDMARKS)
+def _draw_categories(phase: str, k: int, rng=None):
+    """k category sets for phase as the sampler's shared tuples; read-only."""
+    sampler = CATEGORY_SAMPLERS.get(phase)
+    if sampler is None:
+        return [DEFAULT_CATEGORIES] * k
+    return sampler.draw_many(k, rng)
 
-def random_apartment():
-    return random.choice(APARTMENT_DETAILS)
 
+def sample_categories(phase: str, k: int, rng=None):
+    """k category sets for phase at once (NumPy-vectorized if rng is a Generator)."""
+    return [list(cats) for cats in _draw_categories(phase, k, rng)]
 
-def gen_SI():
-    patterns = [
-        f"Anyone knows what happened near {random_street()}?",
-        f"Any news from {random_neighborhood()}? My relatives live there.",
-        f"Is the metro at {random_metro()} still running?",
-        f"Did something hit close to {random_landmark()}?",
-        f"Can someone update on {random_neighborhood()}? No signal here.",
-    ]
-    return random.choice(patterns)
 
+def categories_for(times):
+    """Category sets for a run of message times, one draw call per phase."""
+    by_phase = {}
+    for k, t in enumerate(times):
+        by_phase.setdefault(get_phase((t - START_TIME).total_seconds() / 3600.0), []).append(k)
+    categories = [None] * len(times)
+    for phase, idxs in by_phase.items():
+        # build_message only reads them, so the shared tuples need no copy
+        for k, cats in zip(idxs, _draw_categories(phase, len(idxs))):
+            categories[k] = cats
+    if profiling.enabled:
+        for cats in categories:
+            profiling.count("chat.categories", "+".join(cats))
+    return categories
 
-def gen_SA():
-    patterns = [
-        f"{random_neighborhood()}, smoke rising.",
-        f"{random_street()} – windows blown out.",
-        f"{random_landmark()}, heavy damage.",
-        f"Strike near {random_metro()} entrance.",
-        f"{random_apartment()}, glass everywhere.",
-    ]
-    return random.choice(patterns)
 
+# ---------------------------------
+# TEXT GENERATORS PER CATEGORY
+# ---------------------------------
 
-def gen_CC():
-    patterns = [
+# Patterns are data: "{slot}" fields are filled from SLOTS, and only for
+# the pattern that gets picked.
+SLOTS = {
+    "street": STREETS,
+    "neighborhood": NEIGHBORHOODS,
+    "metro": METRO_STOPS,
+    "landmark": LANDMARKS,
+    "apartment": APARTMENT_DETAILS,
+}
+
+TEMPLATES = {
+    "SI": [
+        "Anyone knows what happened near {street}?",
+        "Any news from {neighborhood}? My relatives live there.",
+        "Is the metro at {metro} still running?",
+        "Did something hit close to {landmark}?",
+        "Can someone update on {neighborhood}? No signal here.",
+    ],
+    "SA": [
+        "{neighborhood}, smoke rising.",
+        "{street} – windows blown out.",
+        "{landmark}, heavy damage.",
+        "Strike near {metro} entrance.",
+        "{apartment}, glass everywhere.",
+    ],
+    "CC": [
         "Please no exact troop positions here.",
         "Mods, maybe delete videos showing addresses.",
         "Try to blur faces if you post photos.",
         "Stop shouting at each other, we all see the same fear.",
         "If you share rumors, mark them as unverified.",
-    ]
-    return random.choice(patterns)
-
-
-def gen_EM():
-    patterns = [
+    ],
+    "EM": [
         "I can’t stop shaking when I hear sirens.",
         "I’m so tired of being scared.",
         "My chest hurts every time my phone rings now.",
         "I feel like this street will never be calm again.",
         "I’m losing it. I just want our old life back.",
-    ]
-    return random.choice(patterns)
-
-
-def gen_C():
-    patterns = [
+    ],
+    "C": [
         "Stop saying everything is under control. It clearly isn’t.",
         "They had years to prevent this and did nothing.",
         "Our local officials disappeared the moment it got serious.",
         "Every statement they make sounds like a bad script.",
         "No one is responsible, apparently. Just us stuck here.",
-    ]
-    return random.choice(patterns)
-
-
-def gen_MN():
-    patterns = [
-        "Remember when {street} was just traffic noise and kids on bikes?".format(street=random_street()),
+    ],
+    "MN": [
+        "Remember when {street} was just traffic noise and kids on bikes?",
         "This used to be the quiet part of town, now it’s all checkpoints.",
-        "Last year we met at {landmark} for coffee. Now it’s rubble.".format(landmark=random_landmark()),
+        "Last year we met at {landmark} for coffee. Now it’s rubble.",
         "We started keeping shoes by the bed, just in case we have to run.",
         "Our building group chat used to be about lost packages, now it’s about who survived.",
-    ]
-    return random.choice(patterns)
+    ],
+}
+
+GRAMMAR = Grammar(TEMPLATES, SLOTS)
+
+
+def gen_SI():
+    return GRAMMAR.render("SI")
+
+
+def gen_SA():
+    return GRAMMAR.render("SA")
+
+
+def gen_CC():
+    return GRAMMAR.render("CC")
+
+
+def gen_EM():
+    return GRAMMAR.render("EM")
+
+
+def gen_C():
+    return GRAMMAR.render("C")
+
+
+def gen_MN():
+    return GRAMMAR.render("MN")
 
 
 def generate_text_for_categories(categories):
@@ -278,7 +312,30 @@ def generate_text_for_categories(categories):
 # ---------------------------------
 # MAIN GENERATOR
 #
+def build_message(current_time, categories=None):
+    author = random.choice(PARTICIPANTS)
+
+    if categories is None:
+        hours_since_start = (current_time - START_TIME).total_seconds() / 3600.0
+        categories = choose_categories(get_phase(hours_since_start))
+    text = generate_text_for_categories(categories)
+
+    ts = current_time
+    user = author
+
+    return {
+        "timestamp": ts,
+        "user": user,
+        "message": text
+    }
+
+
+# keys of every record build_message returns
+MESSAGE_FIELDS = ("timestamp", "user", "message")
+
+
 def generate_conversation(num_messages=NUM_MESSAGES):
+    """Timestamps are datetime objects; save with save_conversation()."""
     messages = []
     current_time = START_TIME
 
@@ -286,33 +343,192 @@ def generate_conversation(num_messages=NUM_MESSAGES):
         delta_minutes = random.randint(1, 90)
         current_time += timedelta(minutes=delta_minutes)
 
-        hours_since_start = (current_time - START_TIME).total_seconds() / 3600.0
-        phase = get_phase(hours_since_start)
+        messages.append(build_message(current_time))
+
+    return messages
 
-        author = random.choice(PARTICIPANTS)
 
-        categories = choose_categories(phase)
-        text = generate_text_for_categories(categories)
+# ---------------------------------
+# SHARDED GENERATION
+#
+def _conversation_gaps(seed, shard, size):
+    rng = shard_rng(seed, shard, "gaps")
+    return [rng.randint(1, 90) for _ in range(size)]
 
-        ts = current_time.isoformat()
-        user = author
 
-        messages.append({
-            "timestamp": ts,
-            "user": user,
-            "message": text
-        })
+def _conversation_gap_total(seed, shard, size):
+    return sum(_conversation_gaps(seed, shard, size))
 
-    return messages
+
+def _conversation_shard(seed, shard, size, offset):
+    random.seed(shard_seed(seed, shard))
+    current_time = START_TIME + timedelta(minutes=offset)
+    times = []
+    for delta_minutes in _conversation_gaps(seed, shard, size):
+        current_time += timedelta(minutes=delta_minutes)
+        times.append(current_time)
+    # categories for the whole shard first, batched per phase
+    return [build_message(t, cats) for t, cats in zip(times, categories_for(times))]
+
+
+def iter_conversation_sharded(num_messages=NUM_MESSAGES, seed=None, workers=1):
+    """Generate the chat in fixed-size shards across a process pool.
+
+    Each shard's start time comes from the gap totals of the shards before
+    it, so phases line up with the serial schedule. Shards are yielded back
+    in order as they finish, a few in flight at a time. The result depends
+    on seed only, not on workers.
+    """
+    seed = resolve_seed(seed)
+    sizes = [stop - start for start, stop in shard_ranges(num_messages)]
+    totals = run_sharded(
+        _conversation_gap_total,
+        [(seed, k, size) for k, size in enumerate(sizes)],
+        workers,
+    )
+    tasks = [
+        (seed, k, size, offset)
+        for k, (size, offset) in enumerate(zip(sizes, prefix_offsets(totals)))
+    ]
+    for shard in iter_sharded(_conversation_shard, tasks, workers):
+        yield from shard
+
+
+def generate_conversation_sharded(num_messages=NUM_MESSAGES, seed=None, workers=1):
+    return list(iter_conversation_sharded(num_messages, seed, workers))
+
+
+# ---------------------------------
+# RANDOM ACCESS
+#
+# Message k sits in slot k * SLOT_MINUTES, shifted by up to JITTER_MINUTES
+# either way, so consecutive gaps stay within 1-89 minutes (mean 45) and
+# no running clock is needed to place it.
+SLOT_MINUTES = 45
+JITTER_MINUTES = 22
+
+
+def slot_time(seed, k):
+    jitter = counter_randint(seed, k, "jitter", -JITTER_MINUTES, JITTER_MINUTES)
+    return START_TIME + timedelta(minutes=k * SLOT_MINUTES + jitter)
 
 
-def save_conversation(messages):
-    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
-    with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
-        json.dump(messages, f, ensure_ascii=False, indent=2)
-    print(f"Saved {len(messages)} messages to {OUTPUT_PATH}")
+def get_message(k, seed=0):
+    """k-th message (1-based) of the virtual conversation for seed, in O(1)."""
+    random.seed(shard_seed(seed, k, "message"))
+    return build_message(slot_time(seed, k))
+
+
+def get_range(a, b, seed=0):
+    """Messages a..b-1, in O(b - a)."""
+    return [get_message(k, seed) for k in range(a, b)]
+
+
+# ---------------------------------
+# APPEND
+#
+def iter_continuation(last, n, seed=None):
+    """n messages carrying on after last, the final message of a chat.
+
+    Phases follow the clock, so continuing from last's timestamp keeps the
+    schedule. The random module's state is not stored in the file; draws
+    come from a stream keyed by (seed, minutes since START_TIME) instead.
+    """
+    current_time = datetime.fromisoformat(last["timestamp"])
+    minute = int((current_time - START_TIME).total_seconds() // 60)
+    random.seed(shard_seed(resolve_seed(seed), minute, "append"))
+    for _ in range(n):
+        current_time += timedelta(minutes=random.randint(1, 90))
+        yield build_message(current_time)
+
+
+def continuation_point(f, path=OUTPUT_PATH):
+    """Last message of an open chat file, checked to be one this generator
+    writes; raises ValueError otherwise."""
+    last = serialization.last_record(f)
+    if last is None:
+        raise ValueError(f"{path} has no messages to continue")
+    if set(last) != set(MESSAGE_FIELDS):
+        raise ValueError(
+            f"{path} holds {'/'.join(last)} records, not the generator's "
+            f"{'/'.join(MESSAGE_FIELDS)}; appending would mix two schemas"
+        )
+    return last
+
+
+def append_conversation(n, path=OUTPUT_PATH, seed=None):
+    """Add n messages to an existing JSON chat in place, in O(n)."""
+    with open(path, "r+b") as f:
+        last = continuation_point(f, path)
+        count = serialization.append_records(iter_continuation(last, n, seed), f)
+    print(f"Appended {count} messages to {path}")
+
+
+def save_conversation(messages, path=OUTPUT_PATH, fmt="json"):
+    """Write messages (any iterable); JSON is streamed a record at a time."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        if fmt == "columnar":
+            count = columnar.write(messages, f)
+        else:
+            count = serialization.write_json_array(messages, f)
+    print(f"Saved {count} messages to {path}")
+
+
+def instrument():
+    """Time generation stages and count phases / category mixes for --profile."""
+    profiling.instrument_common()
+    profiling.instrument(
+        sys.modules[__name__],
+        [
+            "generate_conversation", "generate_conversation_sharded", "build_message",
+            "get_phase", "choose_categories", "categories_for", "generate_text_for_categories",
+            "save_conversation",
+        ],
+        "chat",
+        {
+            "get_phase": lambda args, phase: ("chat.phase", phase),
+            "choose_categories": lambda args, cats: ("chat.categories", "+".join(cats)),
+        },
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the crisis group chat.")
+    parser.add_argument("--count", type=int, default=NUM_MESSAGES)
+    parser.add_argument("--out", default=OUTPUT_PATH)
+    parser.add_argument("--format", choices=["json", "columnar"], default="json")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--append", action="store_true",
+        help="add --count messages to the end of an existing JSON --out",
+    )
+    profiling.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.append and (args.format == "columnar" or args.workers is not None):
+        parser.error("--append only supports the serial JSON generator")
+    if args.append:
+        try:
+            with open(args.out, "rb") as f:
+                continuation_point(f, args.out)
+        except (OSError, ValueError) as exc:
+            parser.error(f"cannot append: {exc}")
+    return args
 
 
 if __name__ == "__main__":
-    convo = generate_conversation()
-    save_conversation(convo)
+    args = parse_args()
+    if args.profile:
+        profiling.enable(args.profile_alloc)
+        instrument()
+    if args.append:
+        append_conversation(args.count, args.out, args.seed)
+    else:
+        if args.workers is not None or args.seed is not None:
+            convo = iter_conversation_sharded(args.count, args.seed, args.workers or 1)
+        else:
+            convo = generate_conversation(args.count)
+        save_conversation(convo, args.out, args.format)
+    if args.profile:
+        profiling.finish(args.profile)
@@ -1,8 +1,26 @@
-import json
+import argparse
+import math
 import random
+import sys
 from datetime import datetime, timedelta
 import os
 
+import columnar
+import profiling
+import serialization
+from sharding import (
+    counter_randint,
+    prefix_offsets,
+    resolve_seed,
+    iter_sharded,
+    run_sharded,
+    shard_ranges,
+    shard_rng,
+    shard_seed,
+)
+from templates import Grammar
+from thread_index import ThreadIndexBuilder, index_path, save_index
+
 # ---------------------------------
 # CONFIG
 # ---------------------------------
@@ -74,115 +92,240 @@ def phase_for_index(i: int, total: int) -> str:
 # REALISM HELPERS
 # ---------------------------------
 
-def maybe_double_space(text: str) -> str:
-    # 8% chance to replace a single space with double space
-    if " " not in text or random.random() >= 0.08:
-        return text
-    idxs = [i for i, ch in enumerate(text) if ch == " "]
-    i = random.choice(idxs)
-    return text[:i] + "  " + text[i + 1 :]
+DOUBLE_SPACE_P = 0.08
+HOLD_LETTER_P = 0.03
+TRAILING_PUNCT_P = 0.10
+LOWERCASE_P = 0.12
+SLANG_P = 0.14
 
+TRAILING_PUNCT = ("...", "??", "!!")
 
+BASE_SLANG = ["idk", "jesus", "man", "for real"]
 
+PHASE_SLANG = {
+    "shock": ["wtf", "holy shit", "my hands shaking rn"],
+    "emotional": ["idk anymore", "can't handle this", "i swear"],
+    "routine": ["ok", "i guess", "as usual"],
+}
 
-def maybe_trailing_punct(text: str) -> str:
-    # 10% chance to add trailing punctuation, but not crazy
-    if random.random() >= 0.10:
-        return text
-    return text + random.choice(["...", "??", "!!"])
+# built once instead of on every slangify() call
+SLANG_POOLS = {phase: tuple(BASE_SLANG + extra) for phase, extra in PHASE_SLANG.items()}
+DEFAULT_SLANG_POOL = tuple(BASE_SLANG)
 
 
+# Each edit takes its random choices as uniforms in [0, 1), so the
+# per-message helpers and humanize_batch() share the same code.
 
+def double_space_at(text: str, u: float) -> str:
+    k = int(u * text.count(" "))
+    i = text.index(" ")
+    for _ in range(k):
+        i = text.index(" ", i + 1)
+    return text[:i] + "  " + text[i + 1 :]
 
-def maybe_hold_letter(text: str) -> str:
-    # 3% chance, and only a short repeat
-    if len(text) < 3 or random.random() >= 0.03:
-        return text
-    idx = random.randint(0, len(text) - 2)
+
+def hold_letter_at(text: str, u_idx: float, u_repeat: float) -> str:
+    idx = int(u_idx * (len(text) - 1))
     ch = text[idx]
     if ch.isalpha():
-        repeat = ch * random.randint(2, 3)
+        repeat = ch * (2 + int(u_repeat * 2))
         return text[:idx] + repeat + text[idx + 1 :]
     return text
 
 
+def add_trailing_punct(text: str, u: float) -> str:
+    return text + TRAILING_PUNCT[int(u * len(TRAILING_PUNCT))]
 
 
-def maybe_lowercase(text: str) -> str:
-    if random.random() < 0.12:
-        return text.lower()
-    return text
+def add_slang(text: str, phase: str, u: float) -> str:
+    pool = SLANG_POOLS.get(phase, DEFAULT_SLANG_POOL)
+    return pool[int(u * len(pool))] + " " + text
 
 
 
 
-def slangify(text: str, phase: str) -> str:
-    """Add occasional slang depending on phase."""
-    base_slang = ["idk", "jesus", "man", "for real"]
+def maybe_double_space(text: str, rng=random) -> str:
+    # 8% chance to replace a single space with double space
+    if " " not in text or rng.random() >= DOUBLE_SPACE_P:
+        return text
+    return double_space_at(text, rng.random())
 
-    shock_slang = ["wtf", "holy shit", "my hands shaking rn"]
 
-    emotional_slang = ["idk anymore", "can't handle this", "i swear"]
 
-    routine_slang = ["ok", "i guess", "as usual"]
 
+def maybe_trailing_punct(text: str, rng=random) -> str:
+    # 10% chance to add trailing punctuation, but not crazy
+    if rng.random() >= TRAILING_PUNCT_P:
+        return text
+    return add_trailing_punct(text, rng.random())
 
 
-    pool = base_slang[:]
 
-    if phase == "shock":
-        pool += shock_slang
 
-    if phase == "emotional":
-        pool += emotional_slang
+def maybe_hold_letter(text: str, rng=random) -> str:
+    # 3% chance, and only a short repeat
+    if len(text) < 3 or rng.random() >= HOLD_LETTER_P:
+        return text
+    return hold_letter_at(text, rng.random(), rng.random())
 
-    if phase == "routine":
-        pool += routine_slang
 
 
 
-    if random.random() < 0.14:
-        return random.choice(pool) + " " + text
+def maybe_lowercase(text: str, rng=random) -> str:
+    if rng.random() < LOWERCASE_P:
+        return text.lower()
     return text
 
 
 
 
-def humanize(text: str, phase: str) -> str:
-    text = maybe_double_space(text)
-    text = maybe_hold_letter(text)
-    text = maybe_trailing_punct(text)
-    text = maybe_lowercase(text)
-    text = slangify(text, phase)
+def slangify(text: str, phase: str, rng=random) -> str:
+    """Add occasional slang depending on phase."""
+    if rng.random() < SLANG_P:
+        return add_slang(text, phase, rng.random())
     return text
 
 
 
 
 # ---------------------------------
-# TEMPLATES (UPGRADED)
+# BATCH HUMANIZER
 # ---------------------------------
 
-def shock_text() -> str:
-    patterns = [
-        f"{random.choice(STREETS)}, windows blown out",
-        f"anyone seen smoke near {random.choice(LANDMARKS)}",
-        f"{random.choice(NEIGHBORHOODS)} shaking again",
-        f"just heard a boom near {random.choice(STREETS)}",
-        f"{random.choice(APARTMENTS)} rattled hard",
-        f"sirens nonstop near {random.choice(METRO)}",
-        f"no signal from my family in {random.choice(NEIGHBORHOODS)}",
-        "loud bang, no idea where from",
-        "any updates? my phone keeps buzzing",
-        "dogs barking like crazy rn",
-    ]
-    return random.choice(patterns)
+# uniforms drawn per text, one column each
+(
+    U_SPACE, U_SPACE_AT,
+    U_HOLD, U_HOLD_AT, U_HOLD_REPEAT,
+    U_PUNCT, U_PUNCT_PICK,
+    U_LOWER,
+    U_SLANG, U_SLANG_PICK,
+) = range(10)
+NOISE_DRAWS = 10
+
+
+def draw_noise(n: int, rng=None):
+    """NOISE_DRAWS columns of n uniforms: a NumPy array if rng is a NumPy
+    Generator, else lists from the random module."""
+    if rng is not None:
+        return rng.random((NOISE_DRAWS, n))
+    rand = random.random
+    return [[rand() for _ in range(n)] for _ in range(NOISE_DRAWS)]
+
+
+def _hits(column, p: float) -> list:
+    if hasattr(column, "nonzero"):
+        return (column < p).nonzero()[0].tolist()
+    return [i for i, u in enumerate(column) if u < p]
+
+
+def _apply(texts, idxs, kind, edit):
+    """texts[i] = edit(texts[i], i) for each hit; --profile counts the edits
+    that changed the text, as _humanize_counted does."""
+    counting = profiling.enabled
+    for i in idxs:
+        edited = edit(texts[i], i)
+        if counting and edited != texts[i]:
+            profiling.count("humanize.mutations", kind)
+        texts[i] = edited
+
+
+def humanize_batch(texts, phases, rng=None) -> list:
+    """humanize() over a whole batch, for the NumPy engine.
+
+    All random decisions are drawn up front, then each edit is applied
+    stage by stage to the texts its gate selected, in the same order
+    and with the same probabilities as the per-message helpers.
+    """
+    texts = list(texts)
+    u = draw_noise(len(texts), rng)
+
+    spaced = [i for i in _hits(u[U_SPACE], DOUBLE_SPACE_P) if " " in texts[i]]
+    _apply(texts, spaced, "double_space", lambda t, i: double_space_at(t, float(u[U_SPACE_AT][i])))
+
+    held = [i for i in _hits(u[U_HOLD], HOLD_LETTER_P) if len(texts[i]) >= 3]
+    _apply(
+        texts, held, "hold_letter",
+        lambda t, i: hold_letter_at(t, float(u[U_HOLD_AT][i]), float(u[U_HOLD_REPEAT][i])),
+    )
+
+    _apply(
+        texts, _hits(u[U_PUNCT], TRAILING_PUNCT_P), "trailing_punct",
+        lambda t, i: add_trailing_punct(t, float(u[U_PUNCT_PICK][i])),
+    )
+    _apply(texts, _hits(u[U_LOWER], LOWERCASE_P), "lowercase", lambda t, i: t.lower())
+    _apply(
+        texts, _hits(u[U_SLANG], SLANG_P), "slang",
+        lambda t, i: add_slang(t, phases[i], float(u[U_SLANG_PICK][i])),
+    )
+
+    return texts
+
+
+
+
+HUMANIZE_STEPS = (
+    ("double_space", maybe_double_space),
+    ("hold_letter", maybe_hold_letter),
+    ("trailing_punct", maybe_trailing_punct),
+    ("lowercase", maybe_lowercase),
+)
+
+
+def humanize(text: str, phase: str, rng=random) -> str:
+    if profiling.enabled:
+        return _humanize_counted(text, phase, rng)
+    text = maybe_double_space(text, rng)
+    text = maybe_hold_letter(text, rng)
+    text = maybe_trailing_punct(text, rng)
+    text = maybe_lowercase(text, rng)
+    text = slangify(text, phase, rng)
+    return text
 
 
+def _humanize_counted(text: str, phase: str, rng=random) -> str:
+    """humanize() for --profile runs: same draws, counting the edits that changed text."""
+    for kind, step in HUMANIZE_STEPS:
+        edited = step(text, rng)
+        if edited != text:
+            profiling.count("humanize.mutations", kind)
+        text = edited
+    edited = slangify(text, phase, rng)
+    if edited != text:
+        profiling.count("humanize.mutations", "slang")
+    return edited
 
 
-def negotiation_text() -> str:
-    patterns = [
+
+
+# ---------------------------------
+# TEMPLATES (UPGRADED)
+# ---------------------------------
+
+# Slots are filled only for the pattern that gets picked; a pattern may
+# also be given as (text, weight).
+
+SLOTS = {
+    "street": STREETS,
+    "neighborhood": NEIGHBORHOODS,
+    "metro": METRO,
+    "landmark": LANDMARKS,
+    "apartment": APARTMENTS,
+}
+
+TEMPLATES = {
+    "shock": [
+        "{street}, windows blown out",
+        "anyone seen smoke near {landmark}",
+        "{neighborhood} shaking again",
+        "just heard a boom near {street}",
+        "{apartment} rattled hard",
+        "sirens nonstop near {metro}",
+        "no signal from my family in {neighborhood}",
+        "loud bang, no idea where from",
+        "any updates? my phone keeps buzzing",
+        "dogs barking like crazy rn",
+    ],
+    "negotiation": [
         "pls stop posting coords, it's dangerous",
         "admins say delete vids with street signs",
         "if you share info mark it verified or rumor ok",
@@ -191,30 +334,18 @@ def negotiation_text() -> str:
         "dont post troop moves here",
         "remove faces and plates from videos pls",
         "mods will ban for sharing exact locations",
-    ]
-    return random.choice(patterns)
-
-
-
-
-def polyvocal_text() -> str:
-    patterns = [
-        f"people in {random.choice(NEIGHBORHOODS)} say it's quiet, others say chaos, idk",
+    ],
+    "polyvocal": [
+        "people in {neighborhood} say it's quiet, others say chaos, idk",
         "this video feels staged ngl, something off",
         "occupiers bring food on camera but bombed the bakery last week",
-        f"my friend in {random.choice(NEIGHBORHOODS)} says soldiers helped with evac, another says they looted everything",
+        "my friend in {neighborhood} says soldiers helped with evac, another says they looted everything",
         "city looks different in every clip",
         "can't tell what's real anymore in these channels",
         "some say it's propaganda, some say it's truth, who knows",
         "we watch same war and still see different things",
-    ]
-    return random.choice(patterns)
-
-
-
-
-def emotional_text() -> str:
-    patterns = [
+    ],
+    "emotional": [
         "i'm tired of being scared every damn second",
         "rashists ruined everything here",
         "i miss normal mornings so much",
@@ -223,98 +354,446 @@ def emotional_text() -> str:
         "can't sleep at all, every sound feels like shelling",
         "i want my old life back so bad",
         "feels like this will never end",
-    ]
-    return random.choice(patterns)
-
-
-
-
-def routine_text() -> str:
-    patterns = [
-        f"water truck on {random.choice(STREETS)} until 16:00",
+    ],
+    "routine": [
+        "water truck on {street} until 16:00",
         "power out again in block c",
         "queue for bread already around the corner",
-        f"checkpoint moved closer to {random.choice(LANDMARKS)}",
+        "checkpoint moved closer to {landmark}",
         "traffic crazy near old bridge, avoid if you can",
         "quiet here today, weird feeling",
         "generator broke again, anyone know a good electrician",
         "same schedule: water in morning, blackout in evening",
         "line at pharmacy going outside already",
-    ]
-    return random.choice(patterns)
+    ],
+}
+
+GRAMMAR = Grammar(TEMPLATES, SLOTS)
 
 
 
 
-def generate_message_text(phase: str) -> str:
-    if phase == "shock":
-        base = shock_text()
+def shock_text() -> str:
+    return GRAMMAR.render("shock")
 
-    elif phase == "negotiation":
-        base = negotiation_text()
 
-    elif phase == "polyvocal":
-        base = polyvocal_text()
+def negotiation_text() -> str:
+    return GRAMMAR.render("negotiation")
 
-    elif phase == "emotional":
-        base = emotional_text()
 
-    elif phase == "routine":
-        base = routine_text()
+def polyvocal_text() -> str:
+    return GRAMMAR.render("polyvocal")
+
+
+def emotional_text() -> str:
+    return GRAMMAR.render("emotional")
+
+
+def routine_text() -> str:
+    return GRAMMAR.render("routine")
 
-    else:
-        base = "..."
 
 
 
-    return humanize(base, phase)
+def generate_message_text(phase: str, rng=random) -> str:
+    base = GRAMMAR.render(phase, rng) if phase in GRAMMAR else "..."
+    return humanize(base, phase, rng)
 
 
 
 
+# ---------------------------------
+# REPLY THREADING
+# ---------------------------------
+
+REPLY_P = 0.20
+RECENT_REPLY_P = 0.7   # the rest go to active threads
+RECENCY_MEAN = 6       # mean distance back for recency replies
+ACTIVITY_WINDOW = 512  # messages / reply events remembered
+
+
+class LocalReplies:
+    """Reply targets biased toward recent messages and busy threads.
+
+    A reply either goes back a geometric number of messages (mean
+    RECENCY_MEAN), or picks uniformly from a ring buffer of recent
+    activity in which every new message and every reply received adds an
+    entry, so messages that keep getting replies are picked more often.
+    Both draws are O(1) and memory is bounded by ACTIVITY_WINDOW.
+    Also tracks the thread (root message id) of each reply.
+    """
+
+    def __init__(self, window: int = ACTIVITY_WINDOW):
+        self.window = window
+        self.roots = [0] * window  # thread root of id, at id % window
+        self.activity = []         # (id, root) ring buffer
+        self.pos = 0
+        self.log_q = math.log(1 - 1 / RECENCY_MEAN)
+
+    def _remember(self, msg_id: int, root: int):
+        if len(self.activity) < self.window:
+            self.activity.append((msg_id, root))
+        else:
+            self.activity[self.pos] = (msg_id, root)
+            self.pos = (self.pos + 1) % self.window
+
+    def draw(self, i: int):
+        """(target id, thread root id) for message i, or (None, own id)."""
+        msg_id = i + 1
+        target = None
+        if i > 8 and random.random() < REPLY_P:
+            if random.random() < RECENT_REPLY_P:
+                back = 1 + int(math.log(1 - random.random()) / self.log_q)
+                target = msg_id - min(back, i, self.window - 1)
+                root = self.roots[target % self.window]
+            else:
+                target, root = random.choice(self.activity)
+            self._remember(target, root)
+        else:
+            root = msg_id
+        self.roots[msg_id % self.window] = root
+        self._remember(msg_id, root)
+        return target, root
+
+
 # ---------------------------------
 # TIMELINE GENERATION
 # ---------------------------------
 
-def generate_timeline(n: int = NUM_MESSAGES):
-    messages = []
+def build_message(i: int, total: int, current_time: datetime, replies=None, phase=None, rng=random) -> dict:
+    phase = phase or phase_for_index(i, total)
+    author = rng.choice(PARTICIPANTS)
+
+    thread = None
+    if replies is None:
+        reply_to = None
+        if i > 8 and rng.random() < REPLY_P:
+            reply_to = rng.randint(1, i)
+    else:
+        reply_to, thread = replies.draw(i)
+
+    text = generate_message_text(phase, rng)
+
+    msg = {
+        "id": i + 1,
+        "author": author,
+        # serialized by the writer, no isoformat() round trip here
+        "timestamp": current_time,
+        "phase": phase,
+        "text": text,
+        "reply_to_id": reply_to,
+    }
+    if thread is not None:
+        msg["thread_id"] = thread
+    return msg
+
+
+def iter_timeline(n: int = NUM_MESSAGES, replies=None):
+    """Yield timeline messages one at a time, without holding the list.
+
+    Pass replies=LocalReplies() for recency/thread-biased replies; the
+    messages then also carry their thread_id (id of the thread root).
+    """
     current_time = START_TIME
 
     for i in range(n):
         # random gap between messages
         current_time += timedelta(minutes=random.randint(5, 45))
 
-        phase = phase_for_index(i, n)
-        author = random.choice(PARTICIPANTS)
+        yield build_message(i, n, current_time, replies)
 
-        reply_to = None
-        if i > 8 and random.random() < 0.20:
-            reply_to = random.randint(1, i)
 
-        text = generate_message_text(phase)
+def generate_timeline(n: int = NUM_MESSAGES):
+    """The timeline as a list. Timestamps are datetime objects: write it with
+    save_timeline() / serialization, not a bare json.dump."""
+    return list(iter_timeline(n))
+
 
-        msg = {
-            "id": i + 1,
-            "author": author,
-            "timestamp": current_time.isoformat(),
-            "phase": phase,
-            "text": text,
-            "reply_to_id": reply_to,
-        }
-        messages.append(msg)
+# ---------------------------------
+# SHARDED GENERATION
+# ---------------------------------
 
+def _timeline_gaps(seed: int, shard: int, size: int) -> list:
+    rng = shard_rng(seed, shard, "gaps")
+    return [rng.randint(5, 45) for _ in range(size)]
+
+
+def _timeline_gap_total(seed: int, shard: int, size: int) -> int:
+    return sum(_timeline_gaps(seed, shard, size))
+
+
+def _timeline_shard(seed: int, shard: int, start: int, stop: int, total: int, offset: int):
+    random.seed(shard_seed(seed, shard))
+    current_time = START_TIME + timedelta(minutes=offset)
+    messages = []
+    for i, gap in zip(range(start, stop), _timeline_gaps(seed, shard, stop - start)):
+        current_time += timedelta(minutes=gap)
+        messages.append(build_message(i, total, current_time))
     return messages
 
 
-def save_timeline(messages):
-    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
-    with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
-        json.dump(messages, f, ensure_ascii=False, indent=2)
-    print(f"Saved {len(messages)} messages to {OUTPUT_PATH}")
+def iter_timeline_sharded(n: int = NUM_MESSAGES, seed=None, workers: int = 1):
+    """Generate the timeline in fixed-size shards across a process pool.
+
+    Gaps are drawn first so every shard knows its start time, then shards
+    are rendered in parallel and yielded back in id order, a few shards in
+    flight at a time. Output depends on seed only, not on workers.
+    """
+    seed = resolve_seed(seed)
+    ranges = shard_ranges(n)
+    totals = run_sharded(
+        _timeline_gap_total,
+        [(seed, k, stop - start) for k, (start, stop) in enumerate(ranges)],
+        workers,
+    )
+    tasks = [
+        (seed, k, start, stop, n, offset)
+        for k, ((start, stop), offset) in enumerate(zip(ranges, prefix_offsets(totals)))
+    ]
+    for shard in iter_sharded(_timeline_shard, tasks, workers):
+        yield from shard
+
+
+# ---------------------------------
+# RANDOM ACCESS
+# ---------------------------------
+
+# Message i sits in slot (i + 1) * SLOT_MINUTES, shifted by a jitter in
+# [-JITTER_MINUTES, JITTER_MINUTES]. Neighbouring gaps then stay within the
+# serial 5-45 minute range (mean 25) and timestamps need no running sum.
+SLOT_MINUTES = 25
+JITTER_MINUTES = 10
+
+
+def slot_time(seed: int, i: int) -> datetime:
+    jitter = counter_randint(seed, i, "jitter", -JITTER_MINUTES, JITTER_MINUTES)
+    return START_TIME + timedelta(minutes=(i + 1) * SLOT_MINUTES + jitter)
+
+
+def get_message(k: int, total: int = NUM_MESSAGES, seed: int = 0) -> dict:
+    """Message with id k of a virtual timeline of `total` messages.
+
+    Costs O(1): the message only depends on (seed, k), not on 1..k-1.
+    Draws come from a local Random, so the random module is left alone.
+    """
+    if not 1 <= k <= total:
+        raise IndexError(f"message id {k} outside 1..{total}")
+    i = k - 1
+    rng = random.Random(shard_seed(seed, i, "message"))
+    return build_message(i, total, slot_time(seed, i), rng=rng)
 
 
+def get_range(a: int, b: int, total: int = NUM_MESSAGES, seed: int = 0) -> list:
+    """Messages with ids a..b-1, in O(b - a)."""
+    return [get_message(k, total, seed) for k in range(a, b)]
+
+
+# ---------------------------------
+# BATCH (NUMPY) ENGINE
+# ---------------------------------
+
+BATCH_SIZE = 65536
+
+
+def timeline_columns(start: int, stop: int, total: int, offset_minutes: int, rng):
+    """Draw the id range [start, stop) as NumPy columns.
+
+    offset_minutes is the cumulative gap up to (not including) start; the
+    returned minutes column continues from it.
+    """
+    import numpy as np
+
+    idx = np.arange(start, stop, dtype=np.int64)
+    size = stop - start
+
+    minutes = offset_minutes + np.cumsum(rng.integers(5, 46, size=size))
+    stamps = np.datetime64(START_TIME, "m") + minutes.astype("timedelta64[m]")
+
+    ratios = idx / max(1, total - 1)
+    lows = np.array([lo for _, lo, _ in STAGE_BOUNDS])
+    phase_idx = np.searchsorted(lows, ratios, side="right") - 1
+
+    authors = rng.integers(0, len(PARTICIPANTS), size=size)
+
+    has_reply = (idx > 8) & (rng.random(size) < 0.20)
+    # randint(1, i) over the earlier ids, i.e. uniform on [1, idx]
+    targets = rng.integers(1, np.maximum(idx, 1) + 1)
+    reply_to = np.where(has_reply, targets, 0)
+
+    return {
+        "id": idx + 1,
+        "author": authors,
+        # datetime objects, like the python engine; the writer formats them
+        "timestamp": stamps.astype("datetime64[s]").astype(object),
+        "phase": phase_idx,
+        "reply_to_id": reply_to,
+        "minutes": minutes,
+    }
+
+
+def iter_timeline_batched(n: int = NUM_MESSAGES, seed=None, batch_size: int = BATCH_SIZE):
+    """Same schema as iter_timeline(), but ids, authors, phases, reply
+    targets and timestamps are drawn a batch at a time with NumPy.
+
+    Templates are still rendered per row; their humanize noise is drawn
+    for the whole batch by humanize_batch().
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    phase_names = [phase for phase, _, _ in STAGE_BOUNDS]
+    offset = 0
+
+    for start in range(0, n, batch_size):
+        stop = min(n, start + batch_size)
+        cols = timeline_columns(start, stop, n, offset, rng)
+        offset = int(cols["minutes"][-1])
+
+        phases = [phase_names[i] for i in cols["phase"].tolist()]
+        texts = humanize_batch([GRAMMAR.render(phase) for phase in phases], phases, rng)
+
+        for msg_id, author, ts, phase, text, reply in zip(
+            cols["id"].tolist(),
+            cols["author"].tolist(),
+            cols["timestamp"].tolist(),
+            phases,
+            texts,
+            cols["reply_to_id"].tolist(),
+        ):
+            yield {
+                "id": msg_id,
+                "author": PARTICIPANTS[author],
+                "timestamp": ts,
+                "phase": phase,
+                "text": text,
+                "reply_to_id": reply or None,
+            }
+
+
+# ---------------------------------
+# OUTPUT
+# ---------------------------------
+
+WRITERS = {
+    "json": serialization.write_json_array,
+    "ndjson": serialization.write_ndjson,
+    # dictionary-encoded columns; needs the whole timeline in memory
+    "columnar": columnar.write,
+}
+
+
+# ---------------------------------
+# APPEND
+# ---------------------------------
+
+def iter_continuation(last: dict, n: int, seed=None):
+    """n messages carrying on after last, the final record of a timeline.
+
+    Ids and the clock continue from last. Phases are spread over the
+    original count, so new messages stay in last's phase (normally the
+    closing "routine" stage). The random module's state is not stored in
+    the file; draws come from a stream keyed by (seed, last id) instead.
+    """
+    random.seed(shard_seed(resolve_seed(seed), last["id"], "append"))
+    current_time = datetime.fromisoformat(last["timestamp"])
+    for i in range(last["id"], last["id"] + n):
+        current_time += timedelta(minutes=random.randint(5, 45))
+        yield build_message(i, n, current_time, phase=last["phase"])
+
+
+def append_timeline(n: int, path: str = OUTPUT_PATH, seed=None):
+    """Add n messages to an existing JSON / NDJSON timeline in place.
+
+    Only the tail of the file is read and only the closing bracket is
+    rewritten, so the cost is O(n) whatever the file size.
+    """
+    with open(path, "r+b") as f:
+        last = serialization.last_record(f)
+        if last is None:
+            raise ValueError(f"{path} has no messages to continue")
+        count = serialization.append_records(iter_continuation(last, n, seed), f)
+    print(f"Appended {count} messages to {path} (ids {last['id'] + 1}-{last['id'] + count})")
+
+
+def save_timeline(messages, path: str = OUTPUT_PATH, fmt: str = "json"):
+    """Stream messages (any iterable) to path; memory stays flat in len."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        count = WRITERS[fmt](messages, f)
+    print(f"Saved {count} messages to {path}")
+
+
+def instrument():
+    """Time the per-message hot paths for a --profile run."""
+    profiling.instrument_common()
+    profiling.instrument(
+        sys.modules[__name__],
+        ["build_message", "generate_message_text", "humanize", "humanize_batch", "timeline_columns"],
+        "timeline",
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the crisis chat timeline.")
+    parser.add_argument("--count", type=int, default=NUM_MESSAGES)
+    parser.add_argument("--out", default=OUTPUT_PATH)
+    parser.add_argument("--format", choices=sorted(WRITERS), default="json")
+    parser.add_argument(
+        "--engine", choices=["python", "numpy"], default="python",
+        help="numpy draws ids, authors, phases, replies and timestamps in batches",
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--replies", choices=["uniform", "local"], default="uniform",
+        help="local: replies favour recent messages and active threads, and add thread_id",
+    )
+    parser.add_argument(
+        "--thread-index", action="store_true",
+        help="also write <out>.threads.json (root, depth, replies per message)",
+    )
+    parser.add_argument(
+        "--append", action="store_true",
+        help="add --count messages to the end of an existing JSON/NDJSON --out",
+    )
+    profiling.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.append and (
+        args.format == "columnar" or args.engine == "numpy" or args.workers is not None
+        or args.replies == "local" or args.thread_index
+    ):
+        parser.error("--append only supports the default serial generator (json / ndjson)")
+    if args.replies == "local" and (args.engine == "numpy" or (args.workers or 1) > 1):
+        # thread state runs through the whole timeline, so it stays serial
+        parser.error("--replies local needs the serial python engine")
+    return args
 
 
 if __name__ == "__main__":
-    msgs = generate_timeline()
-    save_timeline(msgs)
+    args = parse_args()
+    if args.profile:
+        profiling.enable(args.profile_alloc)
+        instrument()
+    if args.append:
+        append_timeline(args.count, args.out, args.seed)
+    else:
+        if args.replies == "local":
+            if args.seed is not None:
+                random.seed(args.seed)
+            messages = iter_timeline(args.count, LocalReplies())
+        elif args.engine == "numpy":
+            messages = iter_timeline_batched(args.count, seed=args.seed)
+        elif args.workers is not None or args.seed is not None:
+            messages = iter_timeline_sharded(args.count, args.seed, args.workers or 1)
+        else:
+            messages = iter_timeline(args.count)
+        if args.profile:
+            messages = profiling.timed_iter("timeline.generate", messages, field="phase")
+        threads = ThreadIndexBuilder() if args.thread_index else None
+        if threads:
+            messages = threads.feed(messages)
+        save_timeline(messages, args.out, args.format)
+        if threads:
+            save_index(threads.build(), index_path(args.out))
+    if args.profile:
+        profiling.finish(args.profile)
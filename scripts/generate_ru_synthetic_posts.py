@@ -1,11 +1,25 @@
-import json
+import argparse
 
 import random
 
+import sys
+
 from datetime import datetime, timedelta
 
+from itertools import accumulate
+
 import os
 
+import columnar
+
+import profiling
+
+import serialization
+
+from sharding import iter_sharded, resolve_seed, shard_ranges, shard_seed
+
+from templates import Grammar
+
 
 
 # -----------------------------------------------------
@@ -164,6 +178,20 @@ VARIANTS = [
 
 ]
 
+# Every narrative template is followed by one style variant; compiled once,
+
+# with the variant slot filled only for the template that gets picked.
+
+GRAMMAR = Grammar(
+
+    {topic: [base.replace("{", "{{").replace("}", "}}") + " {variant}" for base in bases]
+
+     for topic, bases in TEMPLATES.items()},
+
+    {"variant": VARIANTS},
+
+)
+
 CHANNELS = [
 
     "ru_state_news_daily",
@@ -194,49 +222,192 @@ def weighted_choice(weight_dict):
 
     return random.choices(topics, weights=weights, k=1)[0]
 
+
+
+# Cumulative weights cached per year, so batch draws skip the list rebuild
+
+TOPIC_SAMPLERS = {
+
+    year: (list(weights.keys()), list(accumulate(weights.values())))
+
+    for year, weights in TOPIC_WEIGHTS.items()
+
+}
+
+
+
+def topic_sampler(year):
+
+    return TOPIC_SAMPLERS.get(year, TOPIC_SAMPLERS[2024])
+
 # -----------------------------------------------------
 
 # Main generator
 
 # -----------------------------------------------------
 
-def generate_posts(num_posts=500):
+START_DATE = datetime(2022, 1, 1)
+
+DATE_SPAN_DAYS = 1126  # randint(0, 1125)
+
+BATCH_SIZE = 100_000
 
-    posts = []
 
-    start_date = datetime(2022, 1, 1)
+
+def build_post(i):
+
+    # Random date between 2022–2024
+
+    date = START_DATE + timedelta(days=random.randint(0, 1125))
+
+    year = date.year
+
+    # Pick topic for that year
+
+    topic = weighted_choice(TOPIC_WEIGHTS.get(year, TOPIC_WEIGHTS[2024]))
+
+    # Choose narrative text + variation
+
+    text = GRAMMAR.render(topic)
+
+    # Build post object
+
+    return {
+
+        "id": i + 1,
+
+        "side": "russia",
+
+        "timestamp": date,
+
+        "channel": random.choice(CHANNELS),
+
+        "text": text,
+
+        "tags": [topic],
+
+        "image": None
+
+    }
+
+
+
+def iter_posts(num_posts=500):
 
     for i in range(num_posts):
 
-        # Random date between 2022–2024
+        yield build_post(i)
+
+
+
+def generate_posts(num_posts=500):
+
+    """Timestamps are datetime objects; save with save_posts()."""
+
+    return list(iter_posts(num_posts))
+
 
-        date = start_date + timedelta(days=random.randint(0, 1125))
 
-        year = date.year
+def iter_posts_batched(num_posts=500, start=0, batch_size=BATCH_SIZE):
 
-        # Pick topic for that year
+    """Same posts as build_post(), drawn a batch at a time.
 
-        topic = weighted_choice(TOPIC_WEIGHTS.get(year, TOPIC_WEIGHTS[2024]))
+    Dates come first; posts are then grouped by year and each year's
+    topics are drawn with one random.choices(k=count) call on the cached
+    cumulative weights. Channels are drawn in one call per batch too.
+    """
 
-        # Choose narrative text + variation
+    dates = [START_DATE + timedelta(days=d) for d in range(DATE_SPAN_DAYS)]
 
-        text_base = random.choice(TEMPLATES[topic])
+    for lo in range(start, start + num_posts, batch_size):
 
-        text = f"{text_base} {random.choice(VARIANTS)}"
+        size = min(batch_size, start + num_posts - lo)
 
-        # Build post object
+        days = random.choices(range(DATE_SPAN_DAYS), k=size)
 
-        post = {
+        by_year = {}
 
-            "id": i + 1,
+        for j, d in enumerate(days):
+
+            by_year.setdefault(dates[d].year, []).append(j)
+
+        topics = [None] * size
+
+        for year, idxs in by_year.items():
+
+            if profiling.enabled:  # build_post's counter, which this path never calls
+
+                profiling.count("posts.year", year, len(idxs))
+
+            names, cum_weights = topic_sampler(year)
+
+            for j, topic in zip(idxs, random.choices(names, cum_weights=cum_weights, k=len(idxs))):
+
+                topics[j] = topic
+
+        channels = random.choices(CHANNELS, k=size)
+
+        for j in range(size):
+
+            topic = topics[j]
+
+            yield {
+
+                "id": lo + j + 1,
+
+                "side": "russia",
+
+                "timestamp": dates[days[j]],
+
+                "channel": channels[j],
+
+                "text": GRAMMAR.render(topic),
+
+                "tags": [topic],
+
+                "image": None
+
+            }
+
+
+
+def generate_posts_batched(num_posts=500):
+
+    return list(iter_posts_batched(num_posts))
+
+# -----------------------------------------------------
+
+# Per-channel time-ordered streams (for the mirror merge)
+
+# -----------------------------------------------------
+
+def iter_channel_posts(channel, rng, start=START_DATE, mean_gap_hours=24.0):
+
+    """Endless, time-ordered posts for one channel.
+
+    Gaps are exponential (a Poisson posting process) and topics follow the
+    weights of the year each post lands in. No ids: the merge assigns them.
+    """
+
+    t = start
+
+    while True:
+
+        t += timedelta(hours=rng.expovariate(1.0 / mean_gap_hours))
+
+        names, cum_weights = topic_sampler(t.year)
+
+        topic = rng.choices(names, cum_weights=cum_weights)[0]
+
+        yield {
 
             "side": "russia",
 
-            "timestamp": date.isoformat(),
+            "timestamp": t.replace(microsecond=0),
 
-            "channel": random.choice(CHANNELS),
+            "channel": channel,
 
-            "text": text,
+            "text": GRAMMAR.render(topic, rng),
 
             "tags": [topic],
 
@@ -244,9 +415,49 @@ def generate_posts(num_posts=500):
 
         }
 
-        posts.append(post)
 
-    return posts
+
+# -----------------------------------------------------
+
+# Sharded generation (one derived seed per shard)
+
+# -----------------------------------------------------
+
+def _posts_shard(seed, shard, start, stop, batched=False):
+
+    random.seed(shard_seed(seed, shard))
+
+    if batched:
+
+        return list(iter_posts_batched(stop - start, start))
+
+    return [build_post(i) for i in range(start, stop)]
+
+
+
+def iter_posts_sharded(num_posts=500, seed=None, workers=1, batched=False):
+
+    """Posts in id order, shard by shard; a few shards in flight at a time."""
+
+    seed = resolve_seed(seed)
+
+    tasks = [
+
+        (seed, k, start, stop, batched)
+
+        for k, (start, stop) in enumerate(shard_ranges(num_posts))
+
+    ]
+
+    for shard in iter_sharded(_posts_shard, tasks, workers):
+
+        yield from shard
+
+
+
+def generate_posts_sharded(num_posts=500, seed=None, workers=1, batched=False):
+
+    return list(iter_posts_sharded(num_posts, seed, workers, batched))
 
 # -----------------------------------------------------
 
@@ -256,17 +467,130 @@ def generate_posts(num_posts=500):
 
 OUTPUT_PATH = "public/data/ru_synthetic_posts.json"
 
-def save_posts(posts):
+def save_posts(posts, path=OUTPUT_PATH, fmt="json"):
+
+    """Write posts (any iterable); JSON is streamed a record at a time."""
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    with open(path, "wb") as f:
+
+        if fmt == "columnar":
+
+            count = columnar.write(posts, f)
+
+        else:
+
+            count = serialization.write_json_array(posts, f)
+
+    print(f"Generated {count} synthetic posts.")
+
+    print(f"Saved to {path}")
+
+# -----------------------------------------------------
+
+# Time-sorted output + monthly bucket index
+
+# -----------------------------------------------------
+
+def sort_posts(posts):
+
+    """Posts in timestamp order (stable, so ids stay ascending within a day)."""
+
+    return sorted(posts, key=lambda p: p["timestamp"])
+
+
+
+def month_key(timestamp):
+
+    if isinstance(timestamp, str):
+
+        return timestamp[:7]
+
+    return timestamp.strftime("%Y-%m")
+
+
+
+def month_buckets(posts):
+
+    """One pass over time-sorted posts: {"YYYY-MM": (offset, count)}."""
+
+    buckets = {}
+
+    for offset, post in enumerate(posts):
+
+        key = month_key(post["timestamp"])
+
+        if key in buckets:
+
+            start, count = buckets[key]
+
+            buckets[key] = (start, count + 1)
+
+        else:
+
+            buckets[key] = (offset, 1)
+
+    return buckets
+
+
+
+def index_path(path):
+
+    root, _ = os.path.splitext(path)
+
+    return root + ".index.json"
+
+
+
+def save_month_index(posts, path=OUTPUT_PATH, month_files=False):
+
+    """Write the sidecar index for time-sorted posts saved at path.
+
+    Each month maps to its offset/count in the sorted array; with
+    month_files, that slice is also written to <name>/<YYYY-MM>.json so
+    the client can fetch a single month.
+    """
+
+    root, _ = os.path.splitext(path)
+
+    months = {}
+
+    for key, (offset, count) in month_buckets(posts).items():
+
+        entry = {"offset": offset, "count": count}
+
+        if month_files:
+
+            month_path = os.path.join(root, f"{key}.json")
 
-    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+            os.makedirs(root, exist_ok=True)
 
-    with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
+            with open(month_path, "wb") as f:
 
-        json.dump(posts, f, ensure_ascii=False, indent=2)
+                serialization.dump(posts[offset:offset + count], f, pretty=True)
 
-    print(f"Generated {len(posts)} synthetic posts.")
+            entry["file"] = os.path.relpath(month_path, os.path.dirname(path))
 
-    print(f"Saved to {OUTPUT_PATH}")
+        months[key] = entry
+
+    index = {
+
+        "source": os.path.basename(path),
+
+        "total": len(posts),
+
+        "months": months,
+
+    }
+
+    with open(index_path(path), "wb") as f:
+
+        serialization.dump(index, f, pretty=True)
+
+    print(f"Saved index to {index_path(path)}")
+
+    return index
 
 # -----------------------------------------------------
 
@@ -274,8 +598,100 @@ def save_posts(posts):
 
 # -----------------------------------------------------
 
+def instrument():
+
+    """Time generation and output stages and count posts per year for --profile."""
+
+    profiling.instrument_common()
+
+    profiling.instrument(
+
+        sys.modules[__name__],
+
+        [
+
+            "generate_posts", "generate_posts_batched", "generate_posts_sharded", "build_post",
+
+            "weighted_choice", "sort_posts", "save_posts", "save_month_index",
+
+        ],
+
+        "posts",
+
+        {"build_post": lambda args, post: ("posts.year", post["timestamp"].year)},
+
+    )
+
+
+
+def parse_args(argv=None):
+
+    parser = argparse.ArgumentParser(description="Generate synthetic RU channel posts.")
+
+    parser.add_argument("--count", type=int, default=500)  # Change to 1000 if needed
+
+    parser.add_argument("--out", default=OUTPUT_PATH)
+
+    parser.add_argument("--format", choices=["json", "columnar"], default="json")
+
+    parser.add_argument("--workers", type=int, default=None)
+
+    parser.add_argument("--seed", type=int, default=None)
+
+    parser.add_argument(
+
+        "--engine", choices=["python", "batched"], default="python",
+
+        help="batched draws dates, per-year topics and channels in bulk",
+
+    )
+
+    parser.add_argument("--sort", action="store_true", help="emit posts in timestamp order plus a month index")
+
+    parser.add_argument("--month-files", action="store_true", help="with --sort, also write one file per month")
+
+    profiling.add_arguments(parser)
+
+    return parser.parse_args(argv)
+
+
+
 if __name__ == "__main__":
 
-    posts = generate_posts(500)  # Change to 1000 if needed
+    args = parse_args()
+
+    if args.profile:
+
+        profiling.enable(args.profile_alloc)
+
+        instrument()
+
+    batched = args.engine == "batched"
+
+    # streamed to the writer; only sorting and columnar output need the full list
+
+    if args.workers is not None or args.seed is not None:
+
+        posts = iter_posts_sharded(args.count, args.seed, args.workers or 1, batched)
+
+    elif batched:
+
+        posts = iter_posts_batched(args.count)
+
+    else:
+
+        posts = iter_posts(args.count)
+
+    if args.sort or args.month_files:
+
+        posts = sort_posts(posts)
+
+    save_posts(posts, args.out, args.format)
+
+    if args.sort or args.month_files:
+
+        save_month_index(posts, args.out, args.month_files)
+
+    if args.profile:
 
-    save_posts(posts)
+        profiling.finish(args.profile)
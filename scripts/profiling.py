@@ -0,0 +1,162 @@
+"""Opt-in instrumentation for the data scripts.
+
+Nothing here runs unless a script is started with --profile: the hot
+functions are only wrapped with timers at that point, so normal runs pay
+nothing. A profiled run collects
+
+    stages       calls and inclusive seconds per instrumented function or
+                 iterator (nested stages overlap, so they do not sum)
+    counters     e.g. messages per phase, template hits per rule,
+                 humanize mutations per kind
+    allocations  tracemalloc peak and top allocation sites
+                 (--profile-alloc; slows the run noticeably)
+
+and writes them as JSON plus a short table on stdout.
+"""
+
+import os
+import threading
+import tracemalloc
+from collections import Counter, defaultdict
+from time import perf_counter
+
+import serialization
+
+enabled = False
+
+_started = None
+_stages = {}  # name -> [calls, seconds]
+_counters = defaultdict(Counter)
+_lock = threading.Lock()  # the splitter records from its writer threads
+
+
+def add_arguments(parser):
+    parser.add_argument("--profile", metavar="REPORT", default=None, help="write a profiling report (JSON)")
+    parser.add_argument(
+        "--profile-alloc", action="store_true",
+        help="with --profile, also track allocations (tracemalloc)",
+    )
+
+
+def enable(track_allocations=False):
+    global enabled, _started
+    enabled = True
+    _started = perf_counter()
+    if track_allocations:
+        tracemalloc.start()
+
+
+def count(group, key, n=1):
+    with _lock:
+        _counters[group][key] += n
+
+
+def _add(name, seconds):
+    with _lock:
+        rec = _stages.setdefault(name, [0, 0.0])
+        rec[0] += 1
+        rec[1] += seconds
+
+
+def timed(name, fn, counter=None):
+    """Wrap fn with a timer; counter(args, result) -> (group, key) counts calls."""
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            _add(name, perf_counter() - start)
+        if counter is not None:
+            count(*counter(args, result))
+        return result
+
+    wrapper.__wrapped__ = fn
+    return wrapper
+
+
+def instrument(target, names, prefix, counters=None):
+    """Replace target.<name> (module or class) with timed wrappers."""
+    counters = counters or {}
+    for name in names:
+        fn = getattr(target, name)
+        if not hasattr(fn, "__wrapped__"):  # instrument once per process
+            setattr(target, name, timed(f"{prefix}.{name}", fn, counters.get(name)))
+
+
+def timed_iter(name, iterable, field=None):
+    """Pass items through, timing each next() and counting item[field]."""
+    it = iter(iterable)
+    while True:
+        start = perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            _add(name, perf_counter() - start)
+            return
+        _add(name, perf_counter() - start)
+        if field is not None:
+            count(f"{name}.{field}", item.get(field))
+        yield item
+
+
+def instrument_common():
+    """Time record encoding and count template hits per rule."""
+    from templates import Grammar
+
+    instrument(serialization.backend, ["dumps"], "serialization")
+    instrument(Grammar, ["render"], "templates", {"render": lambda args, _: ("templates.hits", args[1])})
+
+
+# ---------------------------------
+# REPORT
+# ---------------------------------
+
+def report() -> dict:
+    total = perf_counter() - _started if _started is not None else 0.0
+    stages = {
+        name: {"calls": calls, "seconds": round(seconds, 6), "share": round(seconds / total, 4) if total else None}
+        for name, (calls, seconds) in sorted(_stages.items(), key=lambda kv: -kv[1][1])
+    }
+    doc = {
+        "total_seconds": round(total, 6),
+        "stages": stages,
+        "counters": {
+            group: {str(k): v for k, v in c.most_common()} for group, c in sorted(_counters.items())
+        },
+    }
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics("lineno")[:10]
+        doc["allocations"] = {
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "top_sites": [
+                {"site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}", "bytes": s.size, "count": s.count}
+                for s in top
+            ],
+        }
+    return doc
+
+
+def print_summary(doc):
+    print(f"\n{'stage':40}{'calls':>10}{'seconds':>12}{'share':>8}")
+    for name, s in doc["stages"].items():
+        share = f"{s['share']:.0%}" if s["share"] is not None else ""
+        print(f"{name:40}{s['calls']:>10}{s['seconds']:>12.4f}{share:>8}")
+    print(f"{'total':40}{'':>10}{doc['total_seconds']:>12.4f}")
+    for group, values in doc["counters"].items():
+        top = ", ".join(f"{k}={v}" for k, v in list(values.items())[:8])
+        print(f"{group}: {top}")
+    if "allocations" in doc:
+        print(f"allocations: peak {doc['allocations']['peak_bytes'] / 2**20:.1f} MiB")
+
+
+def finish(path):
+    """Write the report to path and print the summary table."""
+    doc = report()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        serialization.dump(doc, f, pretty=True)
+    print_summary(doc)
+    print(f"Saved profile to {path}")
+    return doc
@@ -0,0 +1,67 @@
+"""Discrete samplers shared by the generator scripts."""
+
+import random
+
+
+class AliasTable:
+    """Walker/Vose alias table: O(n) to build, O(1) per draw.
+
+    A draw uses a single uniform u: int(u * n) picks a column and the
+    fractional part decides between the column and its alias.
+    """
+
+    def __init__(self, outcomes, weights):
+        n = len(outcomes)
+        if n == 0 or len(weights) != n:
+            raise ValueError("need one weight per outcome")
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("weights must sum to a positive number")
+
+        scaled = [w * n / total for w in weights]
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # whatever is left is 1.0 up to rounding
+
+        self.outcomes = list(outcomes)
+        self.prob = prob
+        self.alias = alias
+
+    def pick(self, u: float):
+        x = u * len(self.prob)
+        i = int(x)
+        return self.outcomes[i] if x - i < self.prob[i] else self.outcomes[self.alias[i]]
+
+    def draw(self, rng=random):
+        return self.pick(rng.random())
+
+    def draw_many(self, k: int, rng=None) -> list:
+        """k draws; vectorized when rng is a NumPy Generator."""
+        if rng is None:
+            # pick() inlined: this loop is the hot path without NumPy
+            rand = random.random
+            n, prob, alias, outcomes = len(self.prob), self.prob, self.alias, self.outcomes
+            out = []
+            for _ in range(k):
+                x = rand() * n
+                i = int(x)
+                out.append(outcomes[i] if x - i < prob[i] else outcomes[alias[i]])
+            return out
+
+        import numpy as np
+
+        n = len(self.prob)
+        x = rng.random(k) * n
+        cols = x.astype(np.int64)
+        keep = (x - cols) < np.asarray(self.prob)[cols]
+        idx = np.where(keep, cols, np.asarray(self.alias)[cols])
+        return [self.outcomes[i] for i in idx.tolist()]
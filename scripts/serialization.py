@@ -0,0 +1,275 @@
+"""Shared JSON layer for the data scripts.
+
+Uses orjson or msgspec when one is installed and falls back to the stdlib
+json module otherwise. Every backend returns UTF-8 bytes, writes naive
+datetimes as ISO-8601 ("2024-02-24T05:17:00") so the generators can hand
+over datetime objects as-is, and has a minified and a two-space indented
+("pretty") mode. The stdlib and orjson pretty output is byte-identical to
+json.dumps(obj, ensure_ascii=False, indent=2).
+
+Also holds the streaming readers for JSON-array / NDJSON files and the
+in-place appender.
+
+Set MEDIA_MIRROR_JSON=stdlib|orjson|msgspec to pin a backend.
+"""
+
+import json
+import os
+from datetime import date, datetime
+
+
+def _stdlib_default(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class StdlibBackend:
+    name = "stdlib"
+
+    def dumps(self, obj, pretty=False):
+        if pretty:
+            text = json.dumps(obj, ensure_ascii=False, indent=2, default=_stdlib_default)
+        else:
+            text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_stdlib_default)
+        return text.encode("utf-8")
+
+    def loads(self, data):
+        if isinstance(data, memoryview):  # json only takes str / bytes
+            data = data.tobytes()
+        return json.loads(data)
+
+
+class OrjsonBackend:
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+
+    def dumps(self, obj, pretty=False):
+        return self._orjson.dumps(obj, option=self._orjson.OPT_INDENT_2 if pretty else 0)
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+
+class MsgspecBackend:
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+
+        self._json = msgspec.json
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj, pretty=False):
+        data = self._encoder.encode(obj)
+        return self._json.format(data, indent=2) if pretty else data
+
+    def loads(self, data):
+        return self._decoder.decode(data)
+
+
+BACKENDS = {
+    "orjson": OrjsonBackend,
+    "msgspec": MsgspecBackend,
+    "stdlib": StdlibBackend,
+}
+
+
+def select_backend(name=None):
+    """Return the named backend, or the fastest one that imports."""
+    name = name or os.environ.get("MEDIA_MIRROR_JSON")
+    if name:
+        return BACKENDS[name]()
+    for cls in BACKENDS.values():
+        try:
+            return cls()
+        except ImportError:
+            continue
+    return StdlibBackend()
+
+
+backend = select_backend()
+
+
+def dumps(obj, pretty=False) -> bytes:
+    return backend.dumps(obj, pretty)
+
+
+def loads(data):
+    return backend.loads(data)
+
+
+def dump(obj, f, pretty=False):
+    """Write obj to a binary file."""
+    f.write(backend.dumps(obj, pretty))
+
+
+def load(f):
+    return backend.loads(f.read())
+
+
+def write_json_array(records, f) -> int:
+    """Write records as an indented JSON array, one record at a time.
+
+    The bytes match json.dump(records, f, ensure_ascii=False, indent=2).
+    """
+    count = 0
+    for record in records:
+        f.write(b"[\n  " if count == 0 else b",\n  ")
+        f.write(backend.dumps(record, True).replace(b"\n", b"\n  "))
+        count += 1
+    f.write(b"\n]" if count else b"[]")
+    return count
+
+
+def write_ndjson(records, f) -> int:
+    """Write one compact JSON record per line."""
+    count = 0
+    for record in records:
+        f.write(backend.dumps(record))
+        f.write(b"\n")
+        count += 1
+    return count
+
+
+# ---------------------------------
+# STREAMING READERS
+# ---------------------------------
+
+READ_CHUNK = 1 << 16
+
+
+def iter_json_array(f, chunk_size=READ_CHUNK):
+    """Yield the objects of a top-level JSON array without loading it all."""
+    # stdlib on purpose: orjson/msgspec have no incremental decoder
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    while True:
+        # skip whitespace, the opening bracket and separators
+        while pos < len(buf) and buf[pos] in " \t\r\n,[":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        if pos < len(buf):
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield obj
+                pos = end
+                continue
+        if eof:
+            return
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        pos = 0
+
+
+def iter_ndjson(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            yield loads(line)
+
+
+def iter_records(f):
+    """Sniff the input: '[' means a JSON array, anything else NDJSON."""
+    head = f.read(1)
+    while head and head.isspace():
+        head = f.read(1)
+    if head == "[":
+        return iter_json_array(f)
+    rest = iter_ndjson(f)
+    if not head:
+        return rest
+    first_line = head + f.readline()
+    return _chain_line(first_line, rest)
+
+
+def _chain_line(first_line, rest):
+    if first_line.strip():
+        yield loads(first_line)
+    yield from rest
+
+
+# ---------------------------------
+# IN-PLACE APPEND
+# ---------------------------------
+
+TAIL_BYTES = 64 * 1024
+
+# in write_json_array output only a record starts a line with two spaces
+# and a brace; nested lines are indented deeper, and strings hold no raw
+# newlines
+_RECORD_START = b"\n  {"
+
+
+def last_record(f, tail_bytes=TAIL_BYTES):
+    """Last record of a JSON array (as written above) or NDJSON file.
+
+    Reads only the end of the binary file f, widening the window until a
+    whole record fits. Returns None when there are no records.
+    """
+    size = f.seek(0, os.SEEK_END)
+    window = tail_bytes
+    while True:
+        start = max(0, size - window)
+        f.seek(start)
+        body = f.read().rstrip()
+        if not body:
+            return None
+        if body.endswith(b"]"):
+            body = body[:-1].rstrip()
+            if body.endswith(b"["):
+                return None
+            pos = body.rfind(_RECORD_START)
+        else:
+            pos = body.rfind(b"\n")
+        if pos >= 0:
+            return loads(body[pos + 1:])
+        if start == 0:
+            if body.startswith(b"{"):  # single NDJSON line
+                return loads(body)
+            raise ValueError("not an indented JSON array or NDJSON file")
+        window *= 2
+
+
+def append_records(records, f) -> int:
+    """Append records to a JSON array or NDJSON file without rewriting it.
+
+    f is opened "r+b". For an array only the closing bracket is replaced,
+    so the result matches write_json_array over all the records; NDJSON
+    just gets more lines. Cost is O(new records).
+    """
+    size = f.seek(0, os.SEEK_END)
+    f.seek(max(0, size - 64))
+    tail = f.read()
+    stripped = tail.rstrip()
+
+    if not stripped.endswith(b"]"):
+        f.seek(size)
+        if stripped and not tail.endswith(b"\n"):
+            f.write(b"\n")
+        return write_ndjson(records, f)
+
+    prefix = stripped[:-1].rstrip()  # up to the last record's "}" (or "[")
+    empty = prefix.endswith(b"[")
+    f.seek(size - len(tail) + len(prefix))
+    f.truncate()
+    count = 0
+    for record in records:
+        f.write(b"\n  " if empty and count == 0 else b",\n  ")
+        f.write(backend.dumps(record, True).replace(b"\n", b"\n  "))
+        count += 1
+    f.write(b"]" if empty and count == 0 else b"\n]")
+    return count
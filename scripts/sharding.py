@@ -0,0 +1,77 @@
+"""Deterministic sharding helpers shared by the generator scripts.
+
+An id range is cut into fixed-size shards. Every shard gets its own RNG
+streams derived from (seed, shard index, stream name), so the merged
+output for a seed is the same whatever the number of workers.
+
+The same derivation doubles as a counter-based RNG: keyed by a message
+index instead of a shard index, it gives draws for any message without
+replaying the ones before it.
+"""
+
+import hashlib
+import random
+from collections import deque
+from itertools import accumulate
+
+SHARD_SIZE = 10_000
+
+
+def shard_ranges(n: int, size: int = SHARD_SIZE):
+    return [(start, min(n, start + size)) for start in range(0, n, size)]
+
+
+def shard_seed(seed: int, shard: int, stream: str = "main") -> int:
+    # hashlib rather than hash(): str hashing is salted per process
+    key = f"{seed}:{shard}:{stream}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+
+
+def counter_randint(seed: int, index: int, field: str, a: int, b: int) -> int:
+    """Integer in [a, b], like random.randint, keyed by (seed, index, field)."""
+    return a + shard_seed(seed, index, field) % (b - a + 1)
+
+
+def shard_rng(seed: int, shard: int, stream: str = "main") -> random.Random:
+    return random.Random(shard_seed(seed, shard, stream))
+
+
+def prefix_offsets(totals):
+    """Offset of each shard given the per-shard totals (first one is 0)."""
+    return list(accumulate(totals, initial=0))[:-1]
+
+
+def run_sharded(fn, tasks, workers: int = 1):
+    """Call fn(*task) for every task, in a process pool if workers > 1.
+
+    Results are returned in task order, all at once; for small results
+    such as per-shard totals. Use iter_sharded() for shard contents.
+    """
+    return list(iter_sharded(fn, tasks, workers))
+
+
+def iter_sharded(fn, tasks, workers: int = 1):
+    """Yield fn(*task) for every task, in task order, as shards finish.
+
+    At most 2 * workers tasks are in flight, so memory is bounded by a few
+    shards however many there are.
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield fn(*task)
+        return
+    # imported here: concurrent.futures is a noticeable share of startup
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(fn, *task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def resolve_seed(seed):
+    return seed if seed is not None else random.randrange(2**32)
@@ -1,9 +1,33 @@
-import json
+import argparse
 
-import pandas as pd
+import csv
+
+import gzip
+
+import hashlib
+
+import io
+
+import sys
+
+from bisect import bisect_left
+
+from collections import Counter, deque
+
+from datetime import datetime
+
+from itertools import islice
 
 from pathlib import Path
 
+from time import perf_counter
+
+import profiling
+
+import serialization
+
+from serialization import iter_records
+
 
 
 INPUT = "data/crisis_timeline.json"
@@ -12,48 +36,744 @@ OUTPUT_DIR = Path("data/crisis_pages")
 
 PAGE_SIZE = 100
 
+MANIFEST_NAME = "manifest.json"
+
+WINDOW_HOURS = 6
+
+TARGET_BYTES = 64 * 1024
+
+MAX_PAGE_ROWS = 1000
+
+
+
+def paginate(records, page_size=PAGE_SIZE):
+
+    records = iter(records)
+
+    while True:
+
+        page = list(islice(records, page_size))
+
+        if not page:
+
+            return
+
+        yield page
+
+
+
+# ---------------------------------
+# SPLIT STRATEGIES
+# ---------------------------------
+
+def paginate_by_key(records, key, max_rows=MAX_PAGE_ROWS):
+
+    """Start a new page whenever key(record) changes or max_rows is hit."""
+
+    page = []
+
+    current = None
+
+    for record in records:
+
+        k = key(record)
+
+        if page and (k != current or len(page) >= max_rows):
+
+            yield page
+
+            page = []
+
+        page.append(record)
+
+        current = k
+
+    if page:
+
+        yield page
+
+
+
+def paginate_by_phase(records, max_rows=MAX_PAGE_ROWS):
+
+    return paginate_by_key(records, lambda r: r.get("phase"), max_rows)
+
+
+
+def paginate_by_window(records, hours=WINDOW_HOURS, max_rows=MAX_PAGE_ROWS):
+
+    """Pages aligned to fixed windows of the day (00:00, 06:00, ... for 6h)."""
+
+    minutes = int(hours * 60)
+
+    def window(record):
+
+        ts = datetime.fromisoformat(record["timestamp"])
+
+        return int((ts - datetime.min).total_seconds() // 60) // minutes
+
+    return paginate_by_key(records, window, max_rows)
+
+
+
+def row_bytes(record):
+
+    buf = io.StringIO()
+
+    csv.writer(buf, lineterminator="\n").writerow([format_cell(v) for v in record.values()])
+
+    return len(buf.getvalue().encode("utf-8"))
+
+
+
+def paginate_by_bytes(records, target_bytes=TARGET_BYTES, max_rows=MAX_PAGE_ROWS):
+
+    """Close a page once its CSV rows reach about target_bytes."""
+
+    page = []
+
+    size = 0
+
+    for record in records:
+
+        page.append(record)
+
+        size += row_bytes(record)
+
+        if size >= target_bytes or len(page) >= max_rows:
+
+            yield page
+
+            page = []
+
+            size = 0
+
+    if page:
+
+        yield page
+
+
+
+def split_pages(records, strategy="count", page_size=PAGE_SIZE, max_rows=MAX_PAGE_ROWS,
+
+                window_hours=WINDOW_HOURS, target_bytes=TARGET_BYTES):
+
+    if strategy == "count":
+
+        return paginate(records, page_size)
+
+    if strategy == "phase":
+
+        return paginate_by_phase(records, max_rows)
+
+    if strategy == "window":
+
+        return paginate_by_window(records, window_hours, max_rows)
+
+    if strategy == "bytes":
+
+        return paginate_by_bytes(records, target_bytes, max_rows)
+
+    raise ValueError(f"unknown split strategy: {strategy}")
+
+
+
+STRATEGIES = ["count", "phase", "window", "bytes"]
+
+
+
+# ---------------------------------
+# PAGE WRITER
+# ---------------------------------
+
+def format_cell(value):
+
+    if value is None:
+
+        return ""
+
+    return value
+
+
+
+def render_page(rows):
+
+    buf = io.StringIO()
+
+    writer = csv.writer(buf, lineterminator="\n")
+
+    fields = list(rows[0].keys())
+
+    writer.writerow(fields)
+
+    for row in rows:
+
+        writer.writerow([format_cell(row.get(k)) for k in fields])
+
+    return buf.getvalue().encode("utf-8")
+
+
+
+def write_page(data, filename):
+
+    with open(filename, "wb") as f:
+
+        f.write(data)
+
+
+
+# ---------------------------------
+# PRECOMPRESSED VARIANTS
+# ---------------------------------
+
+def gzip_bytes(data):
+
+    # mtime=0 keeps the .gz bytes stable across runs
+
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+
+def brotli_bytes(data):
+
+    try:
+
+        import brotli
+
+    except ImportError as exc:
+
+        raise SystemExit("--compress br needs the 'brotli' package (pip install brotli)") from exc
+
+    return brotli.compress(data, quality=11)
+
+
+
+COMPRESSORS = {
+
+    "gz": gzip_bytes,
+
+    "br": brotli_bytes,
+
+}
+
+
+
+def write_variants(data, filename, compress):
+
+    """Write filename.gz / filename.br next to the page; return their sizes."""
+
+    sizes = {}
+
+    for ext in compress:
+
+        packed = COMPRESSORS[ext](data)
+
+        with open(f"{filename}.{ext}", "wb") as f:
+
+            f.write(packed)
+
+        sizes[ext] = len(packed)
+
+    return sizes
+
+
+
+def page_is_current(previous, entry, filename, compress):
+
+    """True when the last run wrote exactly these bytes (and variants) here."""
+
+    if previous is None or previous["sha256"] != entry["sha256"]:
+
+        return False
+
+    if not filename.is_file() or filename.stat().st_size != entry["bytes"]:
+
+        return False
+
+    variants = previous.get("variants", {})
+
+    return all(ext in variants and Path(f"{filename}.{ext}").is_file() for ext in compress)
+
+
+
+def process_page(page, rows, output_dir, compress=(), previous=None):
+
+    """Render and write one page; returns (entry, seconds, status).
+
+    previous maps file names to the last manifest's entries (diff mode).
+
+    A page whose hash matches its previous entry, and whose files are all
+
+    still on disk, is not rewritten. status is "new", "changed",
+
+    "unchanged", or "written" outside diff mode.
+
+    """
+
+    start = perf_counter()
+
+    filename = Path(output_dir) / f"crisis_timeline_page_{page}.csv"
+
+    data = render_page(rows)
+
+    entry = page_entry(rows, filename, data)
+
+    if previous is None:
+
+        status = "written"
+
+    else:
+
+        old = previous.get(filename.name)
+
+        if page_is_current(old, entry, filename, compress):
+
+            if compress:
+
+                entry["variants"] = {ext: old["variants"][ext] for ext in compress}
+
+            return entry, perf_counter() - start, "unchanged"
+
+        status = "new" if old is None else "changed"
+
+    write_page(data, filename)
+
+    if compress:
+
+        entry["variants"] = write_variants(data, filename, compress)
+
+    return entry, perf_counter() - start, status
+
+
+
+def iter_processed(pages, output_dir, compress=(), workers=1, previous=None):
+
+    """Run process_page over (page, rows) pairs, yielding results in order.
+
+    With workers > 1 pages are serialized on a thread pool (zlib and file
+    writes release the GIL); at most 2 * workers pages are in flight, so
+    memory stays bounded by the page size.
+    """
+
+    if workers <= 1:
+
+        for page, rows in pages:
+
+            yield process_page(page, rows, output_dir, compress, previous)
+
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
 
+        pending = deque()
 
-def main():
+        for page, rows in pages:
 
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+            pending.append(pool.submit(process_page, page, rows, output_dir, compress, previous))
 
+            if len(pending) >= 2 * workers:
 
+                yield pending.popleft().result()
 
-    with open(INPUT, "r", encoding="utf-8") as f:
+        while pending:
 
-        data = json.load(f)
+            yield pending.popleft().result()
 
 
 
-    df = pd.DataFrame(data)
+def report_line(entry, seconds):
 
-    total = len(df)
+    parts = [f"{entry['bytes']} B"]
 
-    num_pages = (total + PAGE_SIZE - 1) // PAGE_SIZE
+    for ext, size in entry.get("variants", {}).items():
 
+        parts.append(f"{ext} {size / max(1, entry['bytes']):.2f}")
 
+    return f"Saved {entry['file']} ({', '.join(parts)}) in {seconds * 1000:.1f} ms"
 
-    print(f"Total messages: {total}, pages: {num_pages}")
 
 
+# ---------------------------------
+# MANIFEST
+# ---------------------------------
 
-    for page in range(num_pages):
+def page_entry(rows, filename, data):
 
-        start = page * PAGE_SIZE
+    """Index entry for one page: id/time ranges, phases, size and hash."""
 
-        end = start + PAGE_SIZE
+    ids = [row["id"] for row in rows if row.get("id") is not None]
 
-        page_df = df.iloc[start:end]
+    stamps = [row["timestamp"] for row in rows if row.get("timestamp")]
 
-        filename = OUTPUT_DIR / f"crisis_timeline_page_{page+1}.csv"
+    return {
 
-        page_df.to_csv(filename, index=False)
+        "file": Path(filename).name,
 
-        print(f"Saved {filename}")
+        "count": len(rows),
+
+        "first_id": min(ids, default=None),
+
+        "last_id": max(ids, default=None),
+
+        # ISO-8601 strings of one format compare in time order
+
+        "min_timestamp": min(stamps, default=None),
+
+        "max_timestamp": max(stamps, default=None),
+
+        "phases": dict(Counter(row.get("phase") for row in rows if row.get("phase"))),
+
+        "bytes": len(data),
+
+        "sha256": hashlib.sha256(data).hexdigest(),
+
+    }
+
+
+
+def write_manifest(entries, output_dir, source, split):
+
+    manifest = {
+
+        "source": str(source),
+
+        "split": split,
+
+        "total": sum(e["count"] for e in entries),
+
+        "pages": entries,
+
+    }
+
+    path = Path(output_dir) / MANIFEST_NAME
+
+    with open(path, "wb") as f:
+
+        serialization.dump(manifest, f, pretty=True)
+
+    print(f"Saved {path}")
+
+    return manifest
+
+
+
+def load_manifest(output_dir=OUTPUT_DIR):
+
+    with open(Path(output_dir) / MANIFEST_NAME, "rb") as f:
+
+        return serialization.load(f)
+
+
+
+class PageIndex:
+
+    """Lookups over a manifest's pages; the bisect keys and the phase map
+    are built once here, so each lookup is O(log pages) or O(1)."""
+
+    def __init__(self, manifest):
+
+        self.pages = manifest["pages"]
+
+        self.last_ids = [p["last_id"] for p in self.pages]
+
+        self.max_timestamps = [p["max_timestamp"] for p in self.pages]
+
+        self.first_by_phase = {}
+
+        for p in self.pages:
+
+            for phase in p["phases"]:
+
+                self.first_by_phase.setdefault(phase, p)
+
+    def page_for_id(self, msg_id):
+
+        """The (id-ordered) page holding msg_id, or None."""
+
+        i = bisect_left(self.last_ids, msg_id)
+
+        if i < len(self.pages) and self.pages[i]["first_id"] <= msg_id:
+
+            return self.pages[i]
+
+        return None
+
+    def page_for_time(self, timestamp):
+
+        """First page whose time range reaches timestamp (ISO-8601 string)."""
+
+        i = bisect_left(self.max_timestamps, timestamp)
+
+        return self.pages[i] if i < len(self.pages) else None
+
+    def first_page_for_phase(self, phase):
+
+        return self.first_by_phase.get(phase)
+
+
+
+def load_index(output_dir=OUTPUT_DIR):
+
+    return PageIndex(load_manifest(output_dir))
+
+
+
+# ---------------------------------
+
+# DIFFERENTIAL REWRITE
+
+# ---------------------------------
+
+CHANGES_NAME = "changes.json"
+
+
+
+def previous_pages(output_dir):
+
+    """file -> entry from the last run's manifest ({} if there is none)."""
+
+    try:
+
+        manifest = load_manifest(output_dir)
+
+    except FileNotFoundError:
+
+        return {}
+
+    return {entry["file"]: entry for entry in manifest["pages"]}
+
+
+
+def remove_orphans(output_dir, entries, compress):
+
+    """Delete page files and variants this run did not produce; return their names."""
+
+    keep = set()
+
+    for entry in entries:
+
+        keep.add(entry["file"])
+
+        keep.update(f"{entry['file']}.{ext}" for ext in compress)
+
+    removed = []
+
+    for path in sorted(Path(output_dir).glob("crisis_timeline_page_*.csv*")):
+
+        if path.name not in keep:
+
+            path.unlink()
+
+            removed.append(path.name)
+
+    return removed
+
+
+
+def write_changes(changes, output_dir):
+
+    """Save which pages were added, rewritten or deleted, for cache invalidation."""
+
+    path = Path(output_dir) / CHANGES_NAME
+
+    with open(path, "wb") as f:
+
+        serialization.dump(changes, f, pretty=True)
+
+    print(
+
+        f"Pages: {len(changes['new'])} new, {len(changes['changed'])} changed, "
+
+        f"{changes['unchanged']} unchanged, {len(changes['deleted'])} files deleted ({path})"
+
+    )
+
+
+
+def main(input_path=INPUT, output_dir=OUTPUT_DIR, page_size=PAGE_SIZE, workers=1, compress=(),
+
+         strategy="count", max_rows=MAX_PAGE_ROWS, window_hours=WINDOW_HOURS,
+
+         target_bytes=TARGET_BYTES, diff=False):
+
+    output_dir = Path(output_dir)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    split = {"strategy": strategy}
+
+    if strategy == "count":
+
+        split["page_size"] = page_size
+
+    else:
+
+        split["max_rows"] = max_rows
+
+    if strategy == "window":
+
+        split["window_hours"] = window_hours
+
+    if strategy == "bytes":
+
+        split["target_bytes"] = target_bytes
+
+    # diff mode: compare against the last run, rewrite only what changed
+
+    previous = previous_pages(output_dir) if diff else None
+
+    changes = {"new": [], "changed": [], "unchanged": 0, "deleted": []}
+
+    entries = []
+
+    with open(input_path, "r", encoding="utf-8") as f:
+
+        records = iter_records(f)
+
+        if profiling.enabled:
+
+            records = profiling.timed_iter("split.read", records, field="phase")
+
+        pages = split_pages(records, strategy, page_size, max_rows, window_hours, target_bytes)
+
+        processed = iter_processed(enumerate(pages, start=1), output_dir, compress, workers, previous)
+
+        for entry, seconds, status in processed:
+
+            entries.append(entry)
+
+            if status == "unchanged":
+
+                changes["unchanged"] += 1
+
+                continue
+
+            if status != "written":
+
+                changes[status].append(entry["file"])
+
+            print(report_line(entry, seconds))
+
+    manifest = write_manifest(entries, output_dir, input_path, split)
+
+    if diff:
+
+        changes["deleted"] = remove_orphans(output_dir, entries, compress)
+
+        write_changes(changes, output_dir)
+
+    print(f"Total messages: {manifest['total']}, pages: {len(entries)}")
+
+
+
+def instrument():
+
+    """Time page rendering, writing and the manifest for --profile."""
+
+    profiling.instrument_common()
+
+    profiling.instrument(
+
+        sys.modules[__name__],
+
+        ["process_page", "render_page", "write_page", "write_variants", "page_entry", "write_manifest"],
+
+        "split",
+
+    )
+
+
+
+def parse_args(argv=None):
+
+    parser = argparse.ArgumentParser(description="Split the crisis timeline into CSV pages.")
+
+    parser.add_argument("--input", default=INPUT, help="JSON array or NDJSON timeline")
+
+    parser.add_argument("--out-dir", default=str(OUTPUT_DIR))
+
+    parser.add_argument(
+
+        "--split", choices=STRATEGIES, default="count",
+
+        help="count: fixed rows; phase: cut at stage changes; "
+
+             "window: fixed time windows; bytes: target page size",
+
+    )
+
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help="rows per page for --split count")
+
+    parser.add_argument("--max-rows", type=int, default=MAX_PAGE_ROWS, help="row cap for the other strategies")
+
+    parser.add_argument("--window-hours", type=float, default=WINDOW_HOURS)
+
+    parser.add_argument("--target-bytes", type=int, default=TARGET_BYTES)
+
+    parser.add_argument("--workers", type=int, default=1)
+
+    parser.add_argument(
+
+        "--compress", nargs="*", choices=sorted(COMPRESSORS), default=[],
+
+        help="also write precompressed .gz / .br siblings for each page",
+
+    )
+
+    parser.add_argument(
+
+        "--diff", action="store_true",
+
+        help="rewrite only pages whose content changed, delete orphaned pages, list changes in changes.json",
+
+    )
+
+    profiling.add_arguments(parser)
+
+    args = parser.parse_args(argv)
+
+    if args.window_hours * 60 < 1:
+
+        # windows are counted in whole minutes
+
+        parser.error("--window-hours must be at least 1/60 (one minute)")
+
+    if "br" in args.compress:
+
+        # checked up front: a worker failing on page 1 leaves a partial split
+
+        try:
+
+            import brotli  # noqa: F401
+
+        except ImportError:
+
+            parser.error("--compress br needs the 'brotli' package (pip install brotli)")
+
+    return args
 
 
 
 if __name__ == "__main__":
 
-    main()
+    args = parse_args()
+
+    if args.profile:
+
+        profiling.enable(args.profile_alloc)
+
+        instrument()
+
+    main(
+
+        args.input, args.out_dir, args.page_size, args.workers, args.compress,
+
+        args.split, args.max_rows, args.window_hours, args.target_bytes, args.diff,
+
+    )
+
+    if args.profile:
+
+        profiling.finish(args.profile)
@@ -0,0 +1,70 @@
+"""Template grammar shared by the generator scripts.
+
+Rules map a name (a phase, a category code, a topic) to a list of
+patterns. A pattern is a str.format-style string whose fields name a slot
+("{street}, windows blown out"), or a (pattern, weight) pair. Patterns are
+parsed once when the grammar is built; render() then picks one pattern
+and expands only that pattern's slots, so no RNG draws or formatting are
+spent on the patterns that are not chosen.
+"""
+
+import random
+from bisect import bisect
+from itertools import accumulate
+from string import Formatter
+
+
+class Rule:
+    def __init__(self, patterns, slots):
+        texts = []
+        weights = []
+        for entry in patterns:
+            text, weight = (entry, 1) if isinstance(entry, str) else entry
+            texts.append(text)
+            weights.append(weight)
+
+        self.compiled = [compile_pattern(text, slots) for text in texts]
+        self.uniform = len(set(weights)) <= 1
+        self.cum_weights = list(accumulate(weights))
+
+    def pick(self, rng=random):
+        if self.uniform:
+            return rng.choice(self.compiled)
+        total = self.cum_weights[-1]
+        return self.compiled[bisect(self.cum_weights, rng.random() * total)]
+
+
+def compile_pattern(text, slots):
+    """Split a pattern into (literal, slot values or None) pairs."""
+    parts = []
+    for literal, field, _spec, _conv in Formatter().parse(text):
+        if field is not None and field not in slots:
+            raise KeyError(f"unknown slot {{{field}}} in template: {text!r}")
+        parts.append((literal, slots[field] if field is not None else None))
+    return parts
+
+
+class Grammar:
+    def __init__(self, rules, slots=None):
+        slots = slots or {}
+        self.rules = {name: Rule(patterns, slots) for name, patterns in rules.items()}
+
+    @classmethod
+    def from_file(cls, path):
+        """Load {"slots": {...}, "rules": {...}} from a JSON file."""
+        import serialization
+
+        with open(path, "rb") as f:
+            data = serialization.load(f)
+        return cls(data["rules"], data.get("slots"))
+
+    def __contains__(self, name):
+        return name in self.rules
+
+    def render(self, name, rng=random):
+        out = []
+        for literal, values in self.rules[name].pick(rng):
+            out.append(literal)
+            if values is not None:
+                out.append(rng.choice(values))
+        return "".join(out)
@@ -0,0 +1,118 @@
+"""Reply-thread index for a generated timeline.
+
+Built in one pass over the messages (replies always point back to an
+earlier id), and stored as flat columns, one entry per message in id
+order:
+
+    root           id of the thread root (own id for non-replies)
+    depth          0 for roots, parent depth + 1 for replies
+    reply_count    number of direct replies
+    child_offsets  CSR offsets: the replies to the message at position k are
+                   children[child_offsets[k]:child_offsets[k + 1]]
+    children       reply ids grouped by parent, ascending
+
+Positions are id - first_id when ids are consecutive (the generator's
+case); otherwise an explicit "ids" column maps positions to ids. The UI
+can then answer "which thread / how many replies / show replies"
+with direct lookups instead of scanning reply_to_id.
+
+    python scripts/thread_index.py data/crisis_timeline.json
+"""
+
+import argparse
+import os
+
+import serialization
+from serialization import iter_records
+
+
+class ThreadIndexBuilder:
+    def __init__(self):
+        self.ids = []
+        self.pos = {}       # id -> position
+        self.parent = []    # position of parent, or -1
+        self.root = []
+        self.depth = []
+        self.reply_count = []
+
+    def add(self, msg):
+        msg_id = msg["id"]
+        p = self.pos.get(msg.get("reply_to_id"), -1)
+        self.pos[msg_id] = len(self.ids)
+        self.ids.append(msg_id)
+        self.parent.append(p)
+        if p < 0:
+            self.root.append(msg_id)
+            self.depth.append(0)
+        else:
+            self.root.append(self.root[p])
+            self.depth.append(self.depth[p] + 1)
+            self.reply_count[p] += 1
+        self.reply_count.append(0)
+
+    def feed(self, messages):
+        """Pass messages through while indexing them (for streaming writers)."""
+        for msg in messages:
+            self.add(msg)
+            yield msg
+
+    def build(self) -> dict:
+        offsets = [0]
+        for count in self.reply_count:
+            offsets.append(offsets[-1] + count)
+        children = [0] * offsets[-1]
+        fill = offsets[:-1]
+        for i, p in enumerate(self.parent):
+            if p >= 0:
+                children[fill[p]] = self.ids[i]
+                fill[p] += 1
+        index = {"count": len(self.ids)}
+        if self.ids and self.ids == list(range(self.ids[0], self.ids[0] + len(self.ids))):
+            index["first_id"] = self.ids[0]
+        else:
+            index["ids"] = self.ids
+        index.update({
+            "root": self.root,
+            "depth": self.depth,
+            "reply_count": self.reply_count,
+            "child_offsets": offsets,
+            "children": children,
+        })
+        return index
+
+
+def build_index(messages) -> dict:
+    builder = ThreadIndexBuilder()
+    for msg in messages:
+        builder.add(msg)
+    return builder.build()
+
+
+def replies_to(index, position):
+    offsets = index["child_offsets"]
+    return index["children"][offsets[position]:offsets[position + 1]]
+
+
+def index_path(path):
+    root, _ = os.path.splitext(path)
+    return root + ".threads.json"
+
+
+def save_index(index, path):
+    with open(path, "wb") as f:
+        serialization.dump(index, f)
+    print(f"Saved thread index for {index['count']} messages to {path}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the reply-thread index of a timeline.")
+    parser.add_argument("timeline", help="JSON array or NDJSON timeline")
+    parser.add_argument("--out", default=None, help="default: <timeline>.threads.json")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    with open(args.timeline, "r", encoding="utf-8") as f:
+        index = build_index(iter_records(f))
+    save_index(index, args.out or index_path(args.timeline))
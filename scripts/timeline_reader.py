@@ -0,0 +1,280 @@
+"""Random access to a generated JSON-array or NDJSON timeline.
+
+    with TimelineReader("data/crisis_timeline.json") as timeline:
+        timeline.get(734_211)
+        timeline.slice(1_000, 1_050)     # ids 1000..1049
+        for msg in timeline.iter_phase("shock"):
+            ...
+
+The timeline is mmap'ed and a side index (<timeline>.records.idx) keeps
+the byte range of every record, its id and its phase code. Opening reads
+the index header and maps both files, so it takes the same time for a
+1 MB or a multi-GB file; a lookup decodes only the records it returns,
+straight from the mapped bytes when orjson/msgspec is available.
+
+The index is built in one pass the first time, and rebuilt whenever the
+timeline's size or mtime no longer match (e.g. after an --append).
+Records without an "id" (the chat) are numbered 1.. in file order.
+
+    python scripts/timeline_reader.py data/crisis_timeline.json --id 42
+    python scripts/timeline_reader.py data/crisis_timeline.json --phase shock
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+import serialization
+
+MAGIC = b"MMTLIDX1"
+NO_PHASE = 255
+
+# write_json_array output: each record starts "\n  {" and ends "\n  }"
+_ARRAY_START = b"\n  {"
+_ARRAY_END = b"\n  }"
+
+
+def index_path(path):
+    root, _ = os.path.splitext(path)
+    return root + ".records.idx"
+
+
+# ---------------------------------
+# INDEX BUILD
+# ---------------------------------
+
+def iter_spans(buf):
+    """(start, end) byte range of every record in a mapped timeline."""
+    start = 0
+    while start < len(buf) and buf[start:start + 1].isspace():
+        start += 1
+    if buf[start:start + 1] == b"[":
+        pos = buf.find(_ARRAY_START, start)
+        while pos >= 0:
+            end = buf.find(_ARRAY_END, pos + 1)
+            if end < 0:
+                raise ValueError("unterminated record; not an indented JSON array?")
+            yield pos + 3, end + 4
+            pos = buf.find(_ARRAY_START, end)
+        return
+    while start < len(buf):
+        end = buf.find(b"\n", start)
+        end = len(buf) if end < 0 else end
+        if buf[start:end].strip():
+            yield start, end
+        start = end + 1
+
+
+def build_index(path, out=None):
+    """Scan the timeline once and write its side index; returns the index path."""
+    out = out or index_path(path)
+    offsets = array("Q")
+    ids = array("q")
+    phase_codes = array("B")
+    phases = []
+
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else b""
+        try:
+            view = memoryview(buf)
+            for n, (start, end) in enumerate(iter_spans(buf)):
+                record = serialization.loads(view[start:end])
+                offsets.extend((start, end))
+                ids.append(record.get("id", n + 1))
+                phase = record.get("phase")
+                if phase is None:
+                    phase_codes.append(NO_PHASE)
+                else:
+                    if phase not in phases:
+                        phases.append(phase)
+                    phase_codes.append(phases.index(phase))
+            view.release()
+        finally:
+            if st.st_size:
+                buf.close()
+
+    count = len(ids)
+    consecutive = count > 0 and ids[-1] - ids[0] == count - 1 and all(
+        ids[k + 1] == ids[k] + 1 for k in range(count - 1)
+    )
+    sections = [("spans", offsets)]
+    if not consecutive:
+        order = sorted(range(count), key=ids.__getitem__)
+        sections += [("ids", array("q", (ids[k] for k in order))), ("order", array("q", order))]
+    sections.append(("phase_codes", phase_codes))
+
+    header = {
+        "source_size": st.st_size,
+        "source_mtime_ns": st.st_mtime_ns,
+        "byteorder": sys.byteorder,
+        "count": count,
+        "first_id": ids[0] if consecutive else None,
+        "phases": phases,
+        "sections": {},
+    }
+    # section offsets depend on the header length, so settle it first
+    blobs = [(name, arr.tobytes(), arr.typecode) for name, arr in sections]
+    for _ in range(2):
+        head = serialization.dumps(header)
+        pos = _align(len(MAGIC) + 4 + len(head))
+        for name, blob, typecode in blobs:
+            header["sections"][name] = [pos, len(blob), typecode]
+            pos = _align(pos + len(blob))
+    head = serialization.dumps(header)
+
+    with open(out, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(head)) + head)
+        for name, blob, _ in blobs:
+            f.write(b"\0" * (header["sections"][name][0] - f.tell()))
+            f.write(blob)
+    return out
+
+
+def _align(n, to=8):
+    return (n + to - 1) // to * to
+
+
+# ---------------------------------
+# READER
+# ---------------------------------
+
+class TimelineReader:
+    def __init__(self, path, index_file=None):
+        self.path = path
+        self.index_file = index_file or index_path(path)
+        self._maps = []
+        st = os.stat(path)
+        header = self._open_index(st)
+        if header is None:
+            build_index(path, self.index_file)
+            header = self._open_index(st)
+
+        self.count = header["count"]
+        self.first_id = header["first_id"]
+        self.phases = header["phases"]
+        self._data = self._map(path) if st.st_size else b""
+        self._view = memoryview(self._data)
+
+    def _map(self, path):
+        with open(path, "rb") as f:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(m)
+        return m
+
+    def _open_index(self, st):
+        """Map the side index and its sections; None if missing or stale."""
+        if not os.path.exists(self.index_file):
+            return None
+        idx = self._map(self.index_file)
+        if idx[:len(MAGIC)] != MAGIC:
+            self._maps.pop().close()
+            return None
+        (size,) = struct.unpack_from("<I", idx, len(MAGIC))
+        header = serialization.loads(idx[len(MAGIC) + 4:len(MAGIC) + 4 + size])
+        if (
+            header["source_size"] != st.st_size
+            or header["source_mtime_ns"] != st.st_mtime_ns
+            or header["byteorder"] != sys.byteorder
+        ):
+            self._maps.pop().close()
+            return None
+        view = memoryview(idx)
+        columns = {}
+        for name, (pos, length, typecode) in header["sections"].items():
+            columns[name] = view[pos:pos + length].cast(typecode)
+        self._spans = columns["spans"]
+        self._ids = columns.get("ids")
+        self._order = columns.get("order")
+        self._phase_codes = columns["phase_codes"]
+        return header
+
+    def close(self):
+        for name in ("_view", "_spans", "_ids", "_order", "_phase_codes"):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        for m in self._maps:
+            m.close()
+        self._maps = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def at(self, k: int) -> dict:
+        """Record at position k (0-based, file order)."""
+        start, end = self._spans[2 * k], self._spans[2 * k + 1]
+        return serialization.loads(self._view[start:end])
+
+    def position(self, msg_id: int):
+        """File position of msg_id, or None."""
+        if self.first_id is not None:
+            k = msg_id - self.first_id
+            return k if 0 <= k < self.count else None
+        i = bisect_left(self._ids, msg_id)
+        if i < self.count and self._ids[i] == msg_id:
+            return self._order[i]
+        return None
+
+    def get(self, msg_id: int) -> dict:
+        k = self.position(msg_id)
+        if k is None:
+            raise KeyError(msg_id)
+        return self.at(k)
+
+    def slice(self, a: int, b: int) -> list:
+        """Records with a <= id < b, in id order."""
+        if self.first_id is not None:
+            lo = max(a - self.first_id, 0)
+            hi = min(b - self.first_id, self.count)
+            return [self.at(k) for k in range(lo, hi)]
+        i = bisect_left(self._ids, a)
+        j = bisect_left(self._ids, b)
+        return [self.at(self._order[k]) for k in range(i, j)]
+
+    def iter_phase(self, name: str):
+        """Records of one phase, in file order; only those are decoded."""
+        if name not in self.phases:
+            return
+        code = self.phases.index(name)
+        for k, c in enumerate(self._phase_codes):
+            if c == code:
+                yield self.at(k)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Look up records of a timeline through its offset index.")
+    parser.add_argument("timeline", help="JSON array or NDJSON timeline")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--id", type=int, help="print one record")
+    group.add_argument("--slice", type=int, nargs=2, metavar=("A", "B"), help="print ids A..B-1")
+    group.add_argument("--phase", help="print every record of a phase")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the index first")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.rebuild:
+        build_index(args.timeline)
+    with TimelineReader(args.timeline) as timeline:
+        if args.id is not None:
+            records = [timeline.get(args.id)]
+        elif args.slice:
+            records = timeline.slice(*args.slice)
+        elif args.phase:
+            records = timeline.iter_phase(args.phase)
+        else:
+            records = []
+            print(f"{len(timeline)} records, phases: {', '.join(timeline.phases) or '-'}")
+        serialization.write_ndjson(records, sys.stdout.buffer)
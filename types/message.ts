@@ -7,4 +7,5 @@ export interface Message {
   phase: Phase;
   text: string;
   reply_to_id: number | null;
+  thread_id?: number;
 }